@@ -0,0 +1,388 @@
+#!/usr/bin/env python3
+# Benchmarks for wr.py and parse_ffuf_output.py that need no network: a local mock web
+# server, stub ffuf/httpx binaries and synthetic wordlists/result files. Every measurement
+# runs in its own Python process, so its peak memory (ru_maxrss) is its own.
+import sys
+import os
+import json
+import time
+import random
+import argparse
+import platform
+import resource
+import datetime
+import tempfile
+import threading
+import subprocess
+import shutil
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, REPO_DIR)
+
+EXTENSIONS = ['.php', '.aspx', '.jsp', '.html', '.js', '.json']
+
+# Stub ffuf: reads the wordlist like ffuf does, prints one progress line and writes
+# an -o file with a few results when asked to
+STUB_FFUF = r'''#!/usr/bin/env python3
+import sys, json
+args = sys.argv[1:]
+words = 0
+with open(args[args.index('-w') + 1], 'rb') as f:
+    for words, _ in enumerate(f, 1):
+        pass
+total = words * (len(args[args.index('-e') + 1].split(',')) + 1 if '-e' in args else 1)
+sys.stderr.write(f":: Progress: [{total}/{total}] :: Job [1/1] :: 1000 req/sec :: Duration: [0:00:01] :: Errors: 0 ::")
+if '-o' in args:
+    url = args[args.index('-u') + 1]
+    results = [{"input": {"FUZZ": f"w{i}"}, "status": 200, "length": 10, "words": 2, "lines": 1,
+                "url": url.replace('FUZZ', f"w{i}")} for i in range(3)]
+    with open(args[args.index('-o') + 1], 'w') as f:
+        json.dump({"commandline": " ".join(sys.argv), "results": results, "config": {}}, f)
+'''
+
+# Stub httpx: every input line is live over http (the mock server) with a plain technology
+STUB_HTTPX = r'''#!/bin/sh
+while [ $# -gt 0 ]; do
+  if [ "$1" = "-l" ]; then list="$2"; fi
+  shift
+done
+while read -r host; do
+  echo "http://$host [Bench] [Apache]"
+done < "$list"
+'''
+
+class MockHandler(BaseHTTPRequestHandler):
+    # Settings are class attributes set by start_mock_server
+    latency = 0.0
+    wildcard = False
+    robots_paths = 50
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        if self.latency:
+            time.sleep(self.latency)
+        path = self.path.split('?')[0]
+        prefix = path.rsplit('/', 1)[0]
+        if path.endswith('/robots.txt') and self.robots_paths:
+            lines = [f"Disallow: /private{i}/" for i in range(self.robots_paths)]
+            body = ("User-agent: *\n" + "\n".join(lines) + f"\nSitemap: http://{self.headers.get('Host')}{prefix}/sitemap.xml\n").encode()
+            status = 200
+        elif path.endswith('/sitemap.xml'):
+            locs = ''.join(f"<url><loc>http://{self.headers.get('Host')}{prefix}/page{i}</loc></url>" for i in range(20))
+            body = f'<?xml version="1.0"?><urlset>{locs}</urlset>'.encode()
+            status = 200
+        elif path.endswith('/') or self.wildcard:
+            # The target prefix is part of the page, so every mock target is a distinct backend
+            body = f"<html><title>Bench {prefix}</title>{path}</html>".encode()
+            status = 200
+        else:
+            body = b'Not found'
+            status = 404
+        self.send_response(status)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+def start_mock_server(latency=0.0, wildcard=False, robots_paths=50):
+    MockHandler.latency = latency
+    MockHandler.wildcard = wildcard
+    MockHandler.robots_paths = robots_paths
+    server = ThreadingHTTPServer(('127.0.0.1', 0), MockHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+def write_stubs(bin_dir):
+    for name, content in (('ffuf', STUB_FFUF), ('httpx', STUB_HTTPX)):
+        path = os.path.join(bin_dir, name)
+        with open(path, 'w') as stub_file:
+            stub_file.write(content)
+        os.chmod(path, 0o755)
+
+def generate_wordlist(path, lines, seed=1):
+    # Mostly unique words, about 10% duplicates, some with extensions and some in config/env families
+    rng = random.Random(seed)
+    suffixes = ['', '', '', '', '', '', '.php', '.html', '.bak', '.config', '.env']
+    with open(path, 'w') as wordlist_file:
+        batch = []
+        for i in range(lines):
+            number = rng.randrange(i + 1) if i and rng.random() < 0.1 else i
+            batch.append(f"word{number}{suffixes[number % len(suffixes)]}\n")
+            if len(batch) >= 100000:
+                wordlist_file.write(''.join(batch))
+                batch = []
+        wordlist_file.write(''.join(batch))
+
+def generate_results(path, results):
+    with open(path, 'w') as results_file:
+        results_file.write('{"commandline": "ffuf", "time": "2024-01-01T00:00:00Z", "results": [')
+        for i in range(results):
+            result = {"input": {"FUZZ": f"path{i}"}, "position": i, "status": (200, 301, 403, 404, 500)[i % 5],
+                      "length": i % 9000, "words": i % 300, "lines": i % 80, "content-type": "text/html",
+                      "redirectlocation": "", "duration": 1000000, "url": f"https://bench.example/path{i}",
+                      "host": "bench.example"}
+            results_file.write((',' if i else '') + json.dumps(result))
+        results_file.write('], "config": {}}')
+
+def peak_memory_mb():
+    # ru_maxrss is in KiB on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+def run_worker(*worker_args, env=None):
+    # Runs one measurement in a fresh process and returns the JSON it prints last
+    output = subprocess.run([sys.executable, os.path.abspath(__file__), '--worker'] + [str(arg) for arg in worker_args],
+                            capture_output=True, text=True, env=env)
+    if output.returncode != 0:
+        raise RuntimeError(f"Worker {worker_args[0]} failed: {output.stderr.strip()[-2000:]}")
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+def worker_compile(wordlist, cache_dir, stream_build):
+    import wr
+    started = time.perf_counter()
+    compiled = wr.compile_wordlist(wordlist, EXTENSIONS, cache_dir, int(stream_build) or None)
+    compile_seconds = time.perf_counter() - started
+    # A second call is what every further target costs: the cache entry is only opened
+    started = time.perf_counter()
+    compiled = wr.compile_wordlist(wordlist, EXTENSIONS, cache_dir, int(stream_build) or None)
+    cached_seconds = time.perf_counter() - started
+    started = time.perf_counter()
+    target_path = wr.write_target_wordlist(['admin', 'backup.zip', 'swagger.json'], compiled,
+                                           tmpfs_max=wr.TMPFS_MAX_MB * 1024 * 1024)
+    target_seconds = time.perf_counter() - started
+    os.remove(target_path)
+    return {
+        'compile_seconds': round(compile_seconds, 3),
+        'cached_open_seconds': round(cached_seconds, 4),
+        'target_wordlist_seconds': round(target_seconds, 3),
+        'compiled_words': compiled.meta['words'],
+        'peak_memory_mb': peak_memory_mb(),
+    }
+
+def worker_robots(base_url, hosts, cache_dir, workers):
+    import wr
+    hosts = int(hosts)
+    urls = [f"{base_url}/h{i}" for i in range(hosts)]
+    results = {}
+    for phase in ('cold', 'cached'):
+        harvester = wr.RobotsHarvester(cache_dir, workers=int(workers))
+        latencies = []
+
+        def timed_fetch(url):
+            started = time.perf_counter()
+            harvester.fetch(url)
+            latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        futures = [harvester.executor.submit(timed_fetch, url) for url in urls]
+        wr.wait(futures)
+        total = time.perf_counter() - started
+        harvester.close()
+        latencies.sort()
+        results[phase] = {
+            'total_seconds': round(total, 3),
+            'fetch_p50_ms': round(latencies[len(latencies) // 2] * 1000, 1),
+            'fetch_p95_ms': round(latencies[int(len(latencies) * 0.95)] * 1000, 1),
+        }
+    results['peak_memory_mb'] = peak_memory_mb()
+    return results
+
+def worker_parse(results_path, jobs):
+    import parse_ffuf_output
+    size = os.path.getsize(results_path)
+    stdout = sys.stdout
+    sys.stdout = open(os.devnull, 'w')
+    try:
+        started = time.perf_counter()
+        parse_ffuf_output.parse_ffuf_json([results_path], jobs=int(jobs))
+        seconds = time.perf_counter() - started
+    finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+    return {
+        'seconds': round(seconds, 3),
+        'mb_per_second': round(size / (1024 * 1024) / seconds, 1),
+        'file_mb': round(size / (1024 * 1024), 1),
+        'peak_memory_mb': peak_memory_mb(),
+    }
+
+def bench_wordlists(sizes, work_dir, stream_build):
+    results = {}
+    for size in sizes:
+        wordlist = os.path.join(work_dir, f"words_{size}.txt")
+        generate_wordlist(wordlist, size)
+        cases = {'in_memory': 0}
+        if stream_build:
+            cases['streaming'] = stream_build
+        for name, memory in cases.items():
+            cache_dir = tempfile.mkdtemp(prefix='cache_', dir=work_dir)
+            print(f"Wordlist builder, {size} lines, {name}...")
+            results.setdefault(str(size), {})[name] = run_worker('compile', wordlist, cache_dir, memory)
+            shutil.rmtree(cache_dir)
+        os.remove(wordlist)
+    return results
+
+def bench_robots(base_url, hosts, work_dir, workers):
+    print(f"Robots harvesting, {hosts} hosts...")
+    return run_worker('robots', base_url, hosts, tempfile.mkdtemp(prefix='robots_', dir=work_dir), workers)
+
+def worker_list(list_path, wordlist, cache_dir, bin_dir, parallel, targets, work_dir):
+    # The wr.py runs are children of this worker only, so RUSAGE_CHILDREN is their peak memory
+    targets = int(targets)
+    env = dict(os.environ, PATH=bin_dir + os.pathsep + os.environ.get('PATH', ''))
+    command = [sys.executable, os.path.join(REPO_DIR, 'wr.py'), '-l', list_path, '-w', wordlist,
+               '--cache-dir', cache_dir, '--parallel', str(parallel)]
+    results = {}
+    for phase in ('first', 'cached'):
+        output_dir = tempfile.mkdtemp(prefix='list_run_', dir=work_dir)
+        started = time.perf_counter()
+        subprocess.run(command, cwd=output_dir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                       stdin=subprocess.DEVNULL, check=True)
+        seconds = time.perf_counter() - started
+        results[phase] = {
+            'total_seconds': round(seconds, 3),
+            'per_target_ms': round(seconds / targets * 1000, 1),
+        }
+        shutil.rmtree(output_dir)
+    peak = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    results['peak_memory_mb'] = round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+    return results
+
+def bench_list_run(base_url, targets, work_dir, bin_dir, parallel):
+    # Wall time of a wr.py list run against the mock server with stub ffuf/httpx, per target.
+    # The first run also compiles the wordlist, the second one shows the per-target overhead.
+    print(f"List run overhead, {targets} targets, --parallel {parallel}...")
+    list_path = os.path.join(work_dir, 'targets.txt')
+    with open(list_path, 'w') as list_file:
+        for i in range(targets):
+            # Without a scheme, so targets go through the httpx probe stage
+            list_file.write(f"{base_url[len('http://'):]}/h{i}\n")
+    wordlist = os.path.join(work_dir, 'list_words.txt')
+    generate_wordlist(wordlist, 10000)
+    cache_dir = tempfile.mkdtemp(prefix='list_cache_', dir=work_dir)
+    return run_worker('list', list_path, wordlist, cache_dir, bin_dir, parallel, targets, work_dir)
+
+def bench_parse(result_counts, work_dir, jobs):
+    results = {}
+    for count in result_counts:
+        path = os.path.join(work_dir, f"results_{count}.json")
+        generate_results(path, count)
+        print(f"parse_ffuf_output.py, {count} results...")
+        measurement = run_worker('parse', path, jobs)
+        measurement['results_per_second'] = round(count / measurement['seconds'])
+        results[str(count)] = measurement
+        os.remove(path)
+    return results
+
+def git_version():
+    try:
+        return subprocess.run(['git', 'describe', '--always', '--dirty'], cwd=REPO_DIR,
+                              capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+def flatten(data, prefix=''):
+    values = {}
+    for key, value in data.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            values.update(flatten(value, f"{name}."))
+        elif isinstance(value, (int, float)):
+            values[name] = value
+    return values
+
+def compare(old_path, new_results):
+    # Prints every numeric value next to the one of an earlier results file
+    with open(old_path, 'r') as old_file:
+        old = flatten(json.load(old_file)['results'])
+    new = flatten(new_results)
+    print(f"\nCompared with {old_path}:")
+    for name, value in new.items():
+        if name in old and old[name]:
+            change = (value - old[name]) / old[name] * 100
+            print(f"{name:<55} {old[name]:>12} -> {value:<12} {change:+.1f}%")
+
+def parse_counts(spec):
+    # "10k,1M" -> [10000, 1000000]
+    counts = []
+    for part in spec.split(','):
+        part = part.strip().lower()
+        multiplier = {'k': 1000, 'm': 1000000}.get(part[-1:], 1)
+        counts.append(int(float(part.rstrip('km')) * multiplier))
+    return counts
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmarks for wr.py and parse_ffuf_output.py, without network access.')
+    parser.add_argument('--sizes', default='10k,100k,1M,10M',
+                        help='Wordlist sizes for the wordlist builder (default: 10k,100k,1M,10M)')
+    parser.add_argument('--stream-build', type=int, default=64,
+                        help='Also measure the streaming builder with this many MB, 0 to skip (default: 64)')
+    parser.add_argument('--robots-hosts', type=int, default=200,
+                        help='Targets for the robots.txt/sitemap.xml harvesting benchmark (default: 200)')
+    parser.add_argument('--robots-workers', type=int, default=20,
+                        help='Concurrent fetches in the harvesting benchmark (default: 20)')
+    parser.add_argument('--targets', type=int, default=50,
+                        help='Targets in the list run benchmark (default: 50)')
+    parser.add_argument('--parallel', type=int, default=1,
+                        help='--parallel of the list run benchmark (default: 1)')
+    parser.add_argument('--results', default='100k,1M',
+                        help='Result counts for the parse_ffuf_output.py benchmark (default: 100k,1M)')
+    parser.add_argument('--jobs', type=int, default=1,
+                        help='-j of parse_ffuf_output.py (default: 1)')
+    parser.add_argument('--latency', type=float, default=0.02,
+                        help='Seconds the mock server waits before every response (default: 0.02)')
+    parser.add_argument('--wildcard', action='store_true', help='Make the mock server answer 200 for every path')
+    parser.add_argument('--only', help='Comma separated benchmarks to run: wordlists,robots,list,parse (default: all)')
+    parser.add_argument('-o', '--output', help='Where to save the results (default: bench-<version>-<timestamp>.json)')
+    parser.add_argument('--compare', help='Earlier results file to compare with')
+    args = parser.parse_args()
+
+    selected = set(args.only.split(',')) if args.only else {'wordlists', 'robots', 'list', 'parse'}
+    work_dir = tempfile.mkdtemp(prefix='wr_bench_')
+    bin_dir = os.path.join(work_dir, 'bin')
+    os.makedirs(bin_dir)
+    write_stubs(bin_dir)
+    server, base_url = start_mock_server(args.latency, args.wildcard)
+    results = {}
+    try:
+        if 'wordlists' in selected:
+            results['wordlist_builder'] = bench_wordlists(parse_counts(args.sizes), work_dir, args.stream_build)
+        if 'robots' in selected:
+            results['robots_fetch'] = bench_robots(base_url, args.robots_hosts, work_dir, args.robots_workers)
+        if 'list' in selected:
+            results['list_run'] = bench_list_run(base_url, args.targets, work_dir, bin_dir, args.parallel)
+        if 'parse' in selected:
+            results['parse_ffuf_output'] = bench_parse(parse_counts(args.results), work_dir, args.jobs)
+    finally:
+        server.shutdown()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    version = git_version()
+    report = {
+        'version': version,
+        'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'settings': vars(args),
+        'results': results,
+    }
+    output = args.output or f"bench-{version or 'unknown'}-{datetime.datetime.now().strftime('%Y%m%d%H%M%S')}.json"
+    with open(output, 'w') as output_file:
+        json.dump(report, output_file, indent=1)
+    print(json.dumps(results, indent=1))
+    print(f"Results saved to {output}")
+    if args.compare:
+        compare(args.compare, results)
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == '--worker':
+        workers = {'compile': worker_compile, 'robots': worker_robots, 'list': worker_list, 'parse': worker_parse}
+        print(json.dumps(workers[sys.argv[2]](*sys.argv[3:])))
+    else:
+        main()
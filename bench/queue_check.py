@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+# Multi-process check of the shared work queue (wr.py --enqueue / --worker), without network
+# access: a local mock web server and a stub ffuf whose behaviour depends on the target.
+# One worker is killed while it holds a lease; the check passes when the lease expires, the
+# target is leased again and finished by another worker, every target is completed exactly
+# once, and a target whose scans keep failing is given up after max_attempts.
+import sys
+import os
+import time
+import signal
+import sqlite3
+import argparse
+import shutil
+import tempfile
+import subprocess
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+from bench import start_mock_server
+
+# Stub ffuf: targets named slow* take a while, fail* exit with status 1 before a request,
+# everything else finishes after a second; an -o file is written like ffuf does
+STUB_FFUF = r'''#!/usr/bin/env python3
+import sys, json, time
+args = sys.argv[1:]
+url = args[args.index('-u') + 1]
+name = url.rsplit('/', 2)[-2]
+words = 0
+with open(args[args.index('-w') + 1], 'rb') as f:
+    for words, _ in enumerate(f, 1):
+        pass
+total = words * (len(args[args.index('-e') + 1].split(',')) + 1 if '-e' in args else 1)
+line = ":: Progress: [{}/{}] :: Job [1/1] :: 1000 req/sec :: Duration: [0:00:01] :: Errors: 0 ::"
+if name.startswith('fail'):
+    sys.stderr.write(line.format(0, total))
+    sys.exit(1)
+time.sleep(__SLOW__ if name.startswith('slow') else 1)
+sys.stderr.write(line.format(total, total))
+if '-o' in args:
+    results = [{"input": {"FUZZ": "w0"}, "status": 200, "length": 10, "words": 2, "lines": 1, "url": url.replace('FUZZ', 'w0')}]
+    with open(args[args.index('-o') + 1], 'w') as f:
+        json.dump({"commandline": " ".join(sys.argv), "results": results, "config": {}}, f)
+'''
+
+def target_rows(queue_path):
+    connection = sqlite3.connect(queue_path, timeout=60)
+    try:
+        return {row[0]: row[1:] for row in connection.execute('SELECT url, status, worker, attempts FROM targets')}
+    finally:
+        connection.close()
+
+def completion_rows(queue_path):
+    connection = sqlite3.connect(queue_path, timeout=60)
+    try:
+        return connection.execute('SELECT url, worker FROM completions').fetchall()
+    finally:
+        connection.close()
+
+def start_worker(work_dir, queue_path, wordlist, env, lease_ttl, parallel, log_name):
+    log_file = open(os.path.join(work_dir, log_name), 'w')
+    command = [sys.executable, os.path.join(REPO_DIR, 'wr.py'), '--worker', queue_path, '-w', wordlist,
+               '--cache-dir', os.path.join(work_dir, 'cache'), '--lease-ttl', str(lease_ttl),
+               '--parallel', str(parallel), '--no-calibrate']
+    # Its own session, so the worker and its ffuf children can be killed together
+    return subprocess.Popen(command, cwd=work_dir, env=env, stdin=subprocess.DEVNULL, stdout=log_file,
+                            stderr=subprocess.STDOUT, start_new_session=True)
+
+def main():
+    parser = argparse.ArgumentParser(description='Multi-process check of the wr.py work queue: lease expiry, re-lease and exactly-once completion.')
+    parser.add_argument('--targets', type=int, default=8, help='Number of ordinary targets (default: 8)')
+    parser.add_argument('--workers', type=int, default=2, help='Workers started after the first one is killed (default: 2)')
+    parser.add_argument('--lease-ttl', type=int, default=3, help='Lease time of the workers in seconds (default: 3)')
+    parser.add_argument('--timeout', type=int, default=180, help='Seconds before the check gives up (default: 180)')
+    parser.add_argument('--keep', action='store_true', help='Keep the work directory')
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix='wr_queue_check_')
+    bin_dir = os.path.join(work_dir, 'bin')
+    os.makedirs(bin_dir)
+    stub_path = os.path.join(bin_dir, 'ffuf')
+    with open(stub_path, 'w') as stub_file:
+        # Long enough for the killed worker's lease to expire while the scan would still run
+        stub_file.write(STUB_FFUF.replace('__SLOW__', str(args.lease_ttl * 2)))
+    os.chmod(stub_path, 0o755)
+    env = dict(os.environ, PATH=bin_dir + os.pathsep + os.environ.get('PATH', ''))
+
+    server, base_url = start_mock_server(robots_paths=0)
+    wordlist = os.path.join(work_dir, 'words.txt')
+    with open(wordlist, 'w') as wordlist_file:
+        wordlist_file.write(''.join(f"word{i}\n" for i in range(20)))
+    victim = f"{base_url}/slow0"
+    failing = f"{base_url}/fail0"
+    urls = [f"{base_url}/t{i}" for i in range(args.targets)] + [victim, failing]
+    list_path = os.path.join(work_dir, 'urls.txt')
+    with open(list_path, 'w') as list_file:
+        list_file.write(''.join(f"{url}\n" for url in urls))
+    queue_path = os.path.join(work_dir, 'queue.db')
+    subprocess.run([sys.executable, os.path.join(REPO_DIR, 'wr.py'), '-l', list_path, '--enqueue', queue_path],
+                   cwd=work_dir, env=env, stdout=subprocess.DEVNULL, check=True)
+
+    failures = []
+    deadline = time.time() + args.timeout
+    # The first worker is killed (with its ffuf) as soon as it holds the victim's lease
+    first = start_worker(work_dir, queue_path, wordlist, env, args.lease_ttl, 1, 'worker0.log')
+    killed_worker = None
+    while time.time() < deadline and first.poll() is None:
+        status, worker, attempts = target_rows(queue_path)[victim]
+        if status == 'leased':
+            killed_worker = worker
+            os.killpg(first.pid, signal.SIGKILL)
+            first.wait()
+            break
+        time.sleep(0.1)
+    if not killed_worker:
+        failures.append(f"the first worker never leased {victim}")
+    workers = [start_worker(work_dir, queue_path, wordlist, env, args.lease_ttl, 2, f"worker{i + 1}.log")
+               for i in range(args.workers)]
+    for worker in workers:
+        try:
+            worker.wait(timeout=max(1, deadline - time.time()))
+        except subprocess.TimeoutExpired:
+            os.killpg(worker.pid, signal.SIGKILL)
+            worker.wait()
+            failures.append(f"worker {worker.pid} did not finish within {args.timeout} s")
+    server.shutdown()
+
+    rows = target_rows(queue_path)
+    completions = completion_rows(queue_path)
+    completed_urls = [url for url, worker in completions]
+    for url in urls:
+        status, worker, attempts = rows[url]
+        if url == failing:
+            if status != 'failed' or attempts != 3:
+                failures.append(f"{url}: expected failed after 3 attempts, got {status} after {attempts}")
+        elif status != 'done':
+            failures.append(f"{url}: expected done, got {status}")
+        elif completed_urls.count(url) != 1:
+            failures.append(f"{url}: {completed_urls.count(url)} completion records")
+    if killed_worker:
+        status, worker, attempts = rows[victim]
+        if attempts < 2:
+            failures.append(f"{victim}: leased {attempts} time(s), the expired lease was not handed out again")
+        if dict(completions).get(victim) == killed_worker:
+            failures.append(f"{victim}: completed by the killed worker {killed_worker}")
+    if failing in completed_urls:
+        failures.append(f"{failing}: has a completion record")
+
+    print(f"{len(urls)} targets, {len(completions)} completions, {args.workers + 1} workers, one killed holding {victim}")
+    for failure in failures:
+        print(f"FAIL {failure}")
+    if args.keep or failures:
+        print(f"Work directory: {work_dir}")
+    if failures:
+        sys.exit(1)
+    print("OK")
+    if not args.keep:
+        shutil.rmtree(work_dir)
+
+if __name__ == '__main__':
+    main()
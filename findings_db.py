@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+import sys
+import os
+import re
+import glob
+import sqlite3
+import argparse
+import datetime
+from urllib.parse import urlparse
+from parse_ffuf_output import ResultsReader, get_color_for_status, parse_status_filter, RESET
+
+# Output files written by wr.py: {domain}_{YYYYMMDD}.json, {domain}_{YYYYMMDD}_larger.json, ..._from<N>.json,
+# {domain}_{YYYYMMDD}_dir_<path>.json for the child scans of --managed-recursion and {domain}_{YYYYMMDD}_quick.json
+filename_pattern = re.compile(r'^(?P<domain>.+)_(?P<date>\d{8})(?:(?P<larger>_larger)|(?P<quick>_quick)|(?P<dir>_dir_.*?))?(_from\d+)?\.json$')
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    path TEXT UNIQUE NOT NULL,
+    mtime REAL NOT NULL,
+    size INTEGER NOT NULL,
+    scan_date TEXT NOT NULL,
+    pass TEXT NOT NULL,
+    ingested TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS findings (
+    id INTEGER PRIMARY KEY,
+    file_id INTEGER NOT NULL REFERENCES files(id) ON DELETE CASCADE,
+    host TEXT NOT NULL,
+    url TEXT NOT NULL,
+    path TEXT NOT NULL,
+    input TEXT,
+    status INTEGER,
+    length INTEGER,
+    words INTEGER,
+    lines INTEGER,
+    content_type TEXT,
+    redirect TEXT,
+    scan_date TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS findings_host ON findings(host);
+CREATE INDEX IF NOT EXISTS findings_status ON findings(status);
+CREATE INDEX IF NOT EXISTS findings_length_lines ON findings(length, lines);
+CREATE INDEX IF NOT EXISTS findings_date ON findings(scan_date);
+CREATE INDEX IF NOT EXISTS findings_path ON findings(path, status);
+CREATE INDEX IF NOT EXISTS findings_key ON findings(host, path, status, scan_date);
+CREATE INDEX IF NOT EXISTS findings_file ON findings(file_id);
+'''
+
+def open_db(db_path):
+    connection = sqlite3.connect(db_path)
+    connection.execute('PRAGMA foreign_keys = ON')
+    connection.execute('PRAGMA journal_mode = WAL')
+    connection.executescript(SCHEMA)
+    return connection
+
+def file_scan_info(json_file, mtime):
+    # Scan date and pass from the wr.py file name, falling back to the file mtime
+    match = filename_pattern.match(os.path.basename(json_file))
+    if match:
+        date = match.group('date')
+        if match.group('larger'):
+            scan_pass = 'long'
+        elif match.group('quick'):
+            scan_pass = 'quick'
+        elif match.group('dir'):
+            scan_pass = 'dir'
+        else:
+            scan_pass = 'short'
+        return f"{date[:4]}-{date[4:6]}-{date[6:]}", scan_pass
+    return datetime.date.fromtimestamp(mtime).isoformat(), 'unknown'
+
+def ingest_file(connection, json_file, batch_size=5000):
+    # Returns the number of findings loaded, or None when the file was already ingested unchanged
+    stat = os.stat(json_file)
+    path = os.path.abspath(json_file)
+    row = connection.execute('SELECT id, mtime, size FROM files WHERE path = ?', (path,)).fetchone()
+    if row and row[1] == stat.st_mtime and row[2] == stat.st_size:
+        return None
+    scan_date, scan_pass = file_scan_info(json_file, stat.st_mtime)
+    with connection:
+        if row:
+            # The file changed since it was ingested, its findings are replaced
+            connection.execute('DELETE FROM files WHERE id = ?', (row[0],))
+        file_id = connection.execute(
+            'INSERT INTO files (path, mtime, size, scan_date, pass, ingested) VALUES (?, ?, ?, ?, ?, ?)',
+            (path, stat.st_mtime, stat.st_size, scan_date, scan_pass, datetime.datetime.now().isoformat(timespec='seconds'))
+        ).lastrowid
+        count = 0
+        batch = []
+        with open(json_file, 'r') as f:
+            for result in ResultsReader(f):
+                url = result.get('url') or ''
+                parsed_url = urlparse(url)
+                inputs = result.get('input') or {}
+                batch.append((
+                    file_id,
+                    (result.get('host') or parsed_url.netloc).lower(),
+                    url,
+                    parsed_url.path or '/',
+                    inputs.get('FUZZ'),
+                    result.get('status'),
+                    result.get('length'),
+                    result.get('words'),
+                    result.get('lines'),
+                    result.get('content-type'),
+                    result.get('redirectlocation'),
+                    scan_date,
+                ))
+                if len(batch) >= batch_size:
+                    insert_findings(connection, batch)
+                    count += len(batch)
+                    batch = []
+        insert_findings(connection, batch)
+        count += len(batch)
+    return count
+
+def insert_findings(connection, batch):
+    connection.executemany(
+        'INSERT INTO findings (file_id, host, url, path, input, status, length, words, lines, content_type, redirect, scan_date) '
+        'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', batch)
+
+def status_clause(status_ranges):
+    if not status_ranges:
+        return '', []
+    clause = ' OR '.join('status BETWEEN ? AND ?' for _ in status_ranges)
+    return f"({clause})", [value for status_range in status_ranges for value in status_range]
+
+def print_findings(rows):
+    count = 0
+    for scan_date, url, status, length, lines in rows:
+        color = get_color_for_status(status) if isinstance(status, int) else RESET
+        print(f"{scan_date} {url} {color}{status}{RESET} {lines} {length}")
+        count += 1
+    if not count:
+        print("No findings.")
+
+def command_ingest(connection, args):
+    json_files = []
+    for pattern in args.json_files:
+        # Expand glob patterns
+        json_files.extend(glob.glob(pattern))
+    if not json_files:
+        print("No JSON files found.")
+        sys.exit(1)
+    ingested = skipped = findings = 0
+    for json_file in sorted(set(json_files)):
+        if not os.path.isfile(json_file):
+            continue
+        try:
+            count = ingest_file(connection, json_file)
+        except ValueError as e:
+            print(f"Could not parse {json_file}: {e}")
+            continue
+        if count is None:
+            skipped += 1
+        else:
+            ingested += 1
+            findings += count
+    print(f"Ingested {ingested} files ({findings} findings), skipped {skipped} unchanged files.")
+
+def command_new(connection, args):
+    # Findings from scans dated `since` or later whose host, path and status never showed up before
+    since = args.since or (datetime.date.today() - datetime.timedelta(days=1)).isoformat()
+    conditions = ['f.scan_date >= ?']
+    parameters = [since]
+    clause, values = status_clause(parse_status_filter(args.status) if args.status else None)
+    if clause:
+        conditions.append(clause.replace('status', 'f.status'))
+        parameters.extend(values)
+    if args.host:
+        conditions.append('f.host = ?')
+        parameters.append(args.host.lower())
+    query = (
+        'SELECT f.scan_date, f.url, f.status, f.length, f.lines FROM findings f '
+        f"WHERE {' AND '.join(conditions)} "
+        'AND NOT EXISTS (SELECT 1 FROM findings o WHERE o.host = f.host AND o.path = f.path '
+        'AND o.status IS f.status AND o.scan_date < ?) '
+        'GROUP BY f.host, f.path, f.status ORDER BY f.host, f.path'
+    )
+    print_findings(connection.execute(query, parameters + [since]))
+
+def command_query(connection, args):
+    conditions = []
+    parameters = []
+    clause, values = status_clause(parse_status_filter(args.status) if args.status else None)
+    if clause:
+        conditions.append(clause)
+        parameters.extend(values)
+    if args.path:
+        # '*' and '?' work as wildcards
+        conditions.append('path GLOB ?')
+        parameters.append('/' + args.path.lstrip('/'))
+    if args.host:
+        conditions.append('host = ?')
+        parameters.append(args.host.lower())
+    if args.date:
+        conditions.append('scan_date = ?')
+        parameters.append(args.date)
+    if args.lines is not None:
+        conditions.append('lines = ?')
+        parameters.append(args.lines)
+    if args.length is not None:
+        conditions.append('length = ?')
+        parameters.append(args.length)
+    where = f"WHERE {' AND '.join(conditions)} " if conditions else ''
+    query = f"SELECT scan_date, url, status, length, lines FROM findings {where}ORDER BY host, path, scan_date"
+    if args.limit:
+        query += f" LIMIT {int(args.limit)}"
+    print_findings(connection.execute(query, parameters))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Local SQLite index of ffuf JSON outputs.')
+    parser.add_argument('--db', default='findings.db', help='Path of the findings database (default: findings.db)')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    ingest_parser = subparsers.add_parser('ingest', help='Load ffuf JSON outputs, skipping files already ingested unchanged')
+    ingest_parser.add_argument('json_files', nargs='+', help='ffuf JSON output files or glob patterns')
+
+    new_parser = subparsers.add_parser('new', help='Findings whose host, path and status were not seen before a date')
+    new_parser.add_argument('--since', help='First scan date to report, YYYY-MM-DD (default: yesterday)')
+    new_parser.add_argument('--status', help='Only these status codes, e.g. 200,301-302,4xx')
+    new_parser.add_argument('--host', help='Only this host')
+
+    query_parser = subparsers.add_parser('query', help='Search the indexed findings')
+    query_parser.add_argument('--status', help='Only these status codes, e.g. 200,301-302,4xx')
+    query_parser.add_argument('--path', help="Path to match, '*' and '?' act as wildcards (e.g. /api/*)")
+    query_parser.add_argument('--host', help='Only this host')
+    query_parser.add_argument('--date', help='Only this scan date, YYYY-MM-DD')
+    query_parser.add_argument('--lines', type=int, help='Only responses with this many lines')
+    query_parser.add_argument('--length', type=int, help='Only responses of this length')
+    query_parser.add_argument('--limit', type=int, help='Show at most this many findings')
+
+    args = parser.parse_args()
+    connection = open_db(args.db)
+    try:
+        if args.command == 'ingest':
+            command_ingest(connection, args)
+        elif args.command == 'new':
+            command_new(connection, args)
+        else:
+            command_query(connection, args)
+    except ValueError as e:
+        print(f"Invalid filter: {e}")
+        sys.exit(1)
+    finally:
+        connection.close()
@@ -3,6 +3,10 @@ import json
 import sys
 import glob
 import os
+import shutil
+import argparse
+import tempfile
+from multiprocessing import Pool
 
 # ANSI color codes
 RESET = '\033[0m'
@@ -11,6 +15,8 @@ YELLOW = '\033[33m'
 RED = '\033[31m'
 MAGENTA = '\033[35m'
 
+WHITESPACE = ' \t\n\r'
+
 def get_color_for_status(status):
     if 200 <= status < 300:
         return GREEN  # Success - Green
@@ -23,33 +29,170 @@ def get_color_for_status(status):
     else:
         return RESET  # Default terminal color
 
-def parse_ffuf_json(json_files):
-    for json_file in json_files:
-        if not os.path.isfile(json_file):
+class ResultsReader:
+    # Reads the top-level "results" array of an ffuf JSON output one entry at a time,
+    # so memory use depends on the largest single result and not on the file size
+    def __init__(self, f, chunk_size=1024 * 1024):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.decoder = json.JSONDecoder()
+        self.buffer = ''
+        self.pos = 0
+        self.eof = False
+
+    def fill(self):
+        # Drop what was consumed and read the next chunk; returns False at end of file
+        if self.eof:
+            return False
+        self.buffer = self.buffer[self.pos:]
+        self.pos = 0
+        data = self.f.read(self.chunk_size)
+        if not data:
+            self.eof = True
+            return False
+        self.buffer += data
+        return True
+
+    def next_char(self):
+        # Skips whitespace and returns the next character without consuming it
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self.fill():
+                raise ValueError('Unexpected end of JSON data')
+
+    def expect(self, chars):
+        char = self.next_char()
+        if char not in chars:
+            raise ValueError(f"Expected one of {chars!r} at offset {self.pos}, found {char!r}")
+        self.pos += 1
+        return char
+
+    def value(self):
+        self.next_char()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+                # A number ending exactly at the end of the buffer may continue in the next chunk
+                if end < len(self.buffer) or self.eof:
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            if not self.fill():
+                self.eof = True
+
+    def __iter__(self):
+        self.expect('{')
+        if self.next_char() == '}':
+            return
+        while True:
+            key = self.value()
+            self.expect(':')
+            if key == 'results':
+                self.expect('[')
+                if self.next_char() == ']':
+                    self.pos += 1
+                else:
+                    while True:
+                        yield self.value()
+                        if self.expect(',]') == ']':
+                            break
+            else:
+                self.value()
+            if self.expect(',}') == '}':
+                return
+
+def parse_status_filter(spec):
+    # "200,301-302,4xx" -> list of (low, high) ranges
+    ranges = []
+    for part in spec.split(','):
+        part = part.strip().lower()
+        if not part:
             continue
+        if part.endswith('xx') and part[:-2].isdigit():
+            low = int(part[:-2]) * 100
+            ranges.append((low, low + 99))
+        elif '-' in part:
+            low, high = part.split('-', 1)
+            ranges.append((int(low), int(high)))
+        else:
+            ranges.append((int(part), int(part)))
+    return ranges
+
+def status_allowed(status, status_ranges):
+    if not status_ranges:
+        return True
+    return isinstance(status, int) and any(low <= status <= high for low, high in status_ranges)
+
+def write_file_results(json_file, out, status_ranges=None, limit=None):
+    # Writes the printable output for one file to out while the file is read, so memory use
+    # does not grow with the number of results
+    count = 0
+    try:
         with open(json_file, 'r') as f:
-            data = json.load(f)
-            results = data.get('results', [])
-            if results:
-                print(f"\nResults from {json_file}:")
-                for result in results:
-                    url = result.get('url')
-                    status = result.get('status')
-                    lines = result.get('lines')
-                    color = get_color_for_status(status)
-                    print(f"{url} {color}{status}{RESET} {lines}")
-            else:
-                print(f"\nNo results found in {json_file}.")
+            for result in ResultsReader(f):
+                status = result.get('status')
+                if not status_allowed(status, status_ranges):
+                    continue
+                if not count:
+                    out.write(f"\nResults from {json_file}:\n")
+                url = result.get('url')
+                result_lines = result.get('lines')
+                color = get_color_for_status(status) if isinstance(status, int) else RESET
+                out.write(f"{url} {color}{status}{RESET} {result_lines}\n")
+                count += 1
+                if limit and count >= limit:
+                    break
+    except ValueError as e:
+        out.write(f"\nCould not parse {json_file}: {e}\n")
+        return
+    if not count:
+        out.write(f"\nNo results found in {json_file}.\n")
+
+def write_file_results_temp(job):
+    # Pool worker: the output of one file goes to a temp file whose path is returned
+    json_file, status_ranges, limit = job
+    with tempfile.NamedTemporaryFile(mode='w', delete=False, prefix='parse_ffuf_') as out:
+        write_file_results(json_file, out, status_ranges, limit)
+    return out.name
+
+def parse_ffuf_json(json_files, status_ranges=None, limit=None, jobs=1):
+    json_files = [json_file for json_file in json_files if os.path.isfile(json_file)]
+    work = [(json_file, status_ranges, limit) for json_file in json_files]
+    if jobs > 1 and len(json_files) > 1:
+        # Files are parsed in parallel into temp files, which are copied out in the order of the files
+        with Pool(min(jobs, len(json_files))) as pool:
+            for output_path in pool.imap(write_file_results_temp, work):
+                with open(output_path, 'r') as output_file:
+                    shutil.copyfileobj(output_file, sys.stdout)
+                os.remove(output_path)
+    else:
+        for json_file, status_ranges, limit in work:
+            write_file_results(json_file, sys.stdout, status_ranges, limit)
 
 if __name__ == "__main__":
-    if len(sys.argv) < 2:
-        print("Usage: python parse_ffuf_output.py <ffuf_output.json> [more_json_files...]")
-        sys.exit(1)
+    parser = argparse.ArgumentParser(description='Print the results of ffuf JSON output files.',
+                                     usage='python parse_ffuf_output.py <ffuf_output.json> [more_json_files...] [options]')
+    parser.add_argument('json_files', nargs='+', help='ffuf JSON output files or glob patterns')
+    parser.add_argument('--status', help='Only show these status codes, e.g. 200,301-302,4xx')
+    parser.add_argument('--limit', type=int, help='Show at most this many results per file')
+    parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count() or 1,
+                        help='Number of files parsed in parallel (default: number of CPUs)')
+    args = parser.parse_args()
     json_files = []
-    for arg in sys.argv[1:]:
+    for arg in args.json_files:
         # Expand glob patterns
         json_files.extend(glob.glob(arg))
     if not json_files:
         print("No JSON files found.")
         sys.exit(1)
-    parse_ffuf_json(json_files)
+    try:
+        status_ranges = parse_status_filter(args.status) if args.status else None
+    except ValueError:
+        print(f"Invalid status filter: {args.status}")
+        sys.exit(1)
+    parse_ffuf_json(json_files, status_ranges, args.limit, args.jobs)
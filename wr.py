@@ -8,18 +8,722 @@ import os
 import warnings
 import datetime
 import random
+import bisect
+import threading
+import json
+import re
+import time
+import hashlib
+import mmap
+import array
+import itertools
+import math
+import shutil
+import ssl
+import glob
+import atexit
+import contextlib
+import sqlite3
+import socket
+import uuid
+import asyncio
+from concurrent.futures import ThreadPoolExecutor, wait
+from requests.adapters import HTTPAdapter
 from urllib3.exceptions import InsecureRequestWarning
-from urllib.parse import urlparse
+from urllib.parse import urlparse, urljoin, quote
+from parse_ffuf_output import ResultsReader, get_color_for_status, RESET
 
-def process_url(url, args, ffuf_args, add_se=False):
-    url = url.strip().rstrip('/')
-    url_with_fuzz = f"{url}/FUZZ"
+# Suppress warnings about unverified HTTPS requests
+warnings.filterwarnings("ignore", category=InsecureRequestWarning)
 
-    parsed_url = urlparse(url)
-    domain = parsed_url.netloc or parsed_url.path  # Adjusted to handle URLs without scheme
-    domain_parts = domain.split('.')
+# ffuf children that are currently running, so an interrupt can stop all of them
+running_processes = set()
+running_lock = threading.Lock()
+stop_event = threading.Event()
+
+def stop_process(process):
+    if process.poll() is None:
+        process.terminate()
+        try:
+            process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+
+# ffuf's status line on stderr, e.g. ":: Progress: [4523/8960] :: Job [1/1] :: 312 req/sec :: Duration: [0:00:14] :: Errors: 0 ::"
+progress_pattern = re.compile(r'Progress: \[(\d+)/(\d+)\] :: Job \[(\d+)/(\d+)\] :: (\d+) req/sec :: Duration: \[([^\]]*)\] :: Errors: (\d+)')
+
+def read_progress(stream, progress, echo):
+    # Copies ffuf's stderr through (unless detached) and keeps the latest progress values
+    pending = ''
+    while True:
+        data = os.read(stream.fileno(), 65536)
+        if not data:
+            break
+        if echo:
+            sys.stderr.buffer.write(data)
+            sys.stderr.buffer.flush()
+        pending = (pending + data.decode('utf-8', 'replace'))[-4096:]
+        matches = progress_pattern.findall(pending)
+        if matches:
+            position, total, job, jobs, rate, duration, errors = matches[-1]
+            progress.update(position=int(position), total=int(total), job=int(job), jobs=int(jobs),
+                            rate=int(rate), duration=duration, errors=int(errors))
+            # Progress of the first job is what a resume can restart from
+            if job == '1':
+                progress['first_job_position'] = int(position)
+            pending = pending[pending.rfind('Progress:') + 1:]
+
+def read_results(stream, on_result, echo):
+    # ffuf -json prints one JSON object per result on stdout
+    for line in stream:
+        try:
+            result = json.loads(line)
+        except ValueError:
+            if echo:
+                sys.stdout.write(line)
+            continue
+        if isinstance(result, dict):
+            on_result(result)
+
+def run_ffuf(ffuf_command, detach=False, progress=None, monitor=None, monitor_interval=5, on_result=None):
+    # Returns False when the run was stopped by an interrupt.
+    # When a progress dict is given, it is kept updated from ffuf's status line and gets ffuf's exit status,
+    # and monitor(process) is called every monitor_interval seconds while ffuf runs.
+    # With on_result, ffuf's stdout is read as -json lines and each result is passed to it.
+    if stop_event.is_set():
+        return False
+    stderr = subprocess.PIPE if progress is not None else None
+    stdout = subprocess.PIPE if on_result else None
+    if detach:
+        # Concurrent children get their own session so Ctrl-C only reaches the scheduler,
+        # and their interactive output is dropped instead of interleaving on the terminal
+        process = subprocess.Popen(ffuf_command, start_new_session=True, stdin=subprocess.DEVNULL,
+                                   stdout=stdout or subprocess.DEVNULL, stderr=stderr or subprocess.DEVNULL)
+    else:
+        process = subprocess.Popen(ffuf_command, stdout=stdout, stderr=stderr)
+    readers = []
+    if progress is not None:
+        readers.append(threading.Thread(target=read_progress, args=(process.stderr, progress, not detach), daemon=True))
+    if on_result:
+        readers.append(threading.Thread(target=read_results, args=(process.stdout, on_result, not detach), daemon=True))
+    for reader in readers:
+        reader.start()
+    with running_lock:
+        running_processes.add(process)
+    try:
+        while True:
+            try:
+                process.wait(timeout=monitor_interval if monitor else None)
+                break
+            except subprocess.TimeoutExpired:
+                monitor(process)
+    except KeyboardInterrupt:
+        stop_process(process)
+        raise
+    finally:
+        with running_lock:
+            running_processes.discard(process)
+        for reader in readers:
+            reader.join(timeout=5)
+    if progress is not None:
+        progress['returncode'] = process.returncode
+    return not stop_event.is_set()
+
+def ffuf_finished(progress):
+    # True when ffuf exited cleanly after sending its whole wordlist; -se, -maxtime, a crash
+    # or a killed child stop it earlier
+    return progress.get('returncode') == 0 and progress.get('position', 0) >= progress.get('total', 0)
+
+def stop_all_processes():
+    with running_lock:
+        processes = list(running_processes)
+    for process in processes:
+        stop_process(process)
+
+class Tracer:
+    # Timed spans of every phase of every target, written as Chrome trace events
+    # (chrome://tracing, Perfetto) or, for a .jsonl path, as a JSON lines timeline that
+    # is appended to while the run goes on
+    def __init__(self, path):
+        self.path = path
+        self.jsonl = path.endswith('.jsonl')
+        self.started = time.time()
+        self.events = []
+        self.lanes = {}
+        self.lock = threading.Lock()
+        self.trace_file = open(path, 'w') if self.jsonl else None
+
+    def add(self, name, target, start, end, args):
+        with self.lock:
+            if self.jsonl:
+                event = {'name': name, 'target': target, 'start': round(start, 6), 'end': round(end, 6),
+                         'duration': round(end - start, 6), 'thread': threading.current_thread().name}
+                event.update(args)
+                self.trace_file.write(json.dumps(event, default=str) + '\n')
+                self.trace_file.flush()
+                return
+            # Every target gets its own row, phases that belong to the whole run share row 0
+            lane = self.lanes.setdefault(target or 'run', len(self.lanes))
+            self.events.append({
+                'name': name, 'cat': 'wr', 'ph': 'X', 'pid': os.getpid(), 'tid': lane,
+                'ts': int((start - self.started) * 1e6), 'dur': int((end - start) * 1e6),
+                'args': dict(args, target=target),
+            })
+
+    def close(self):
+        with self.lock:
+            if self.jsonl:
+                self.trace_file.close()
+                return
+            names = [{'name': 'thread_name', 'ph': 'M', 'pid': os.getpid(), 'tid': lane, 'args': {'name': target}}
+                     for target, lane in self.lanes.items()]
+            with open(self.path, 'w') as trace_file:
+                json.dump({'traceEvents': names + self.events, 'displayTimeUnit': 'ms'}, trace_file, default=str)
+        print(f"Trace saved to {self.path}")
+
+class SamplingProfiler(threading.Thread):
+    # Samples the Python stacks of threads that are inside a profiled phase. Samples are
+    # written in collapsed stack format (one "phase;frame;frame count" line per stack)
+    # for flamegraph.pl or speedscope. Sampling works across all scan threads at once,
+    # where cProfile would only see one of them.
+    def __init__(self, path, interval=0.005):
+        super().__init__(daemon=True)
+        self.path = path
+        self.interval = interval
+        self.active = {}
+        self.counts = {}
+        self.stopped = threading.Event()
+
+    def run(self):
+        own_ident = threading.get_ident()
+        while not self.stopped.wait(self.interval):
+            frames = sys._current_frames()
+            for ident, phase in list(self.active.items()):
+                frame = frames.get(ident)
+                if frame is None or ident == own_ident:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                key = ';'.join([phase] + stack[::-1])
+                self.counts[key] = self.counts.get(key, 0) + 1
+
+    def close(self):
+        self.stopped.set()
+        self.join()
+        with open(self.path, 'w') as profile_file:
+            for stack, count in sorted(self.counts.items()):
+                profile_file.write(f"{stack} {count}\n")
+        print(f"Profile samples saved to {self.path} ({sum(self.counts.values())} samples, collapsed stacks)")
+
+class RunContext:
+    # What main() sets up for one run from its options, handed to the code that scans:
+    # the --trace/--profile recorders, the run budget, managed recursion jobs, learned word
+    # statistics, the extension decision log and the technologies httpx detected per target.
+    # Parts whose option is off are None.
+    def __init__(self, tracer=None, profiler=None, budget=None, directory_jobs=None, hit_stats=None, extension_log=None):
+        self.tracer = tracer
+        self.profiler = profiler
+        self.budget = budget
+        self.directory_jobs = directory_jobs
+        self.hit_stats = hit_stats
+        self.extension_log = extension_log
+        # Filled while the httpx probe runs
+        self.target_technologies = {}
+
+@contextlib.contextmanager
+def trace_span(context, name, target=None, profile=False, **args):
+    # Records the time spent in the with block for the run context's --trace and --profile;
+    # sizes can be added to the yielded dict. profile=True marks Python-side phases for --profile.
+    tracer = context.tracer if context else None
+    profiler = context.profiler if context else None
+    if not tracer and not profiler:
+        yield args
+        return
+    ident = threading.get_ident()
+    outer_phase = profiler.active.get(ident) if profiler else None
+    if profiler and profile:
+        profiler.active[ident] = name
+    start = time.time()
+    try:
+        yield args
+    finally:
+        end = time.time()
+        if profiler and profile:
+            if outer_phase:
+                profiler.active[ident] = outer_phase
+            else:
+                profiler.active.pop(ident, None)
+        if tracer:
+            tracer.add(name, target, start, end, args)
+
+def parse_robots(text):
+    disallowed_paths = []
+    sitemap_urls = []
+    for line in text.splitlines():
+        line = line.strip()
+        if line.lower().startswith('disallow:'):
+            path = line[len('Disallow:'):].strip()
+            if path:
+                # Remove leading slash and any comments
+                path = path.split('#')[0].strip().lstrip('/')
+                if path:
+                    disallowed_paths.append(path.lower())  # Convert to lowercase
+        elif line.lower().startswith('sitemap:'):
+            sitemap_url = line[len('Sitemap:'):].split('#')[0].strip()
+            if sitemap_url:
+                sitemap_urls.append(sitemap_url)
+    return disallowed_paths, sitemap_urls
+
+def parse_sitemap(text, host):
+    # Keep the paths of <loc> entries on the same host, nested sitemaps are not followed
+    paths = []
+    for loc in re.findall(r'<loc>\s*([^<]+?)\s*</loc>', text, re.IGNORECASE):
+        parsed_loc = urlparse(loc)
+        if parsed_loc.netloc.lower() != host:
+            continue
+        path = parsed_loc.path.strip('/').lower()
+        if path and not path.endswith('.xml'):
+            paths.append(path)
+    return paths
+
+class RobotsHarvester:
+    # Fetches robots.txt and sitemap.xml for all targets in the background over pooled
+    # keep-alive connections. Parsed results are cached on disk for `ttl` seconds and
+    # revalidated with ETag/Last-Modified once they expire.
+    max_sitemaps = 3
+    max_sitemap_paths = 500
+
+    def __init__(self, cache_dir, ttl=86400, workers=20, timeout=5, context=None):
+        self.ttl = ttl
+        self.timeout = timeout
+        self.context = context
+        self.session = requests.Session()
+        self.session.verify = False
+        adapter = HTTPAdapter(pool_connections=workers, pool_maxsize=workers)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self.lock = threading.Lock()
+        self.cache_path = os.path.join(cache_dir, 'robots.json') if cache_dir else None
+        self.cache = {}
+        if self.cache_path and os.path.exists(self.cache_path):
+            try:
+                with open(self.cache_path, 'r') as cache_file:
+                    self.cache = json.load(cache_file)
+            except (OSError, ValueError):
+                self.cache = {}
+
+    def fetch_document(self, document_url, parse):
+        # Returns parse(body) for document_url from the cache, refreshing it when it is missing or expired
+        with self.lock:
+            entry = self.cache.get(document_url)
+        now = time.time()
+        if entry and now - entry['fetched'] < self.ttl:
+            return entry['data']
+        headers = {}
+        if entry and entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry and entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        try:
+            response = self.session.get(document_url, headers=headers, timeout=self.timeout)
+            if response.status_code == 304 and entry:
+                entry = dict(entry, fetched=now)
+            elif response.status_code == 200:
+                entry = {
+                    'fetched': now,
+                    'etag': response.headers.get('ETag'),
+                    'last_modified': response.headers.get('Last-Modified'),
+                    'data': parse(response.text),
+                }
+            else:
+                entry = {'fetched': now, 'data': parse('')}
+        except requests.RequestException:
+            # Unreachable hosts are cached too, so reruns do not wait for the timeout again
+            entry = dict(entry, fetched=now) if entry else {'fetched': now, 'data': parse('')}
+        with self.lock:
+            self.cache[document_url] = entry
+        return entry['data']
+
+    def fetch(self, url):
+        url = url.strip().rstrip('/')
+        host = urlparse(url).netloc.lower()
+        with trace_span(self.context, 'robots', url, profile=True) as span:
+            disallowed_paths, sitemap_urls = self.fetch_document(f"{url}/robots.txt", parse_robots)
+            if not sitemap_urls:
+                sitemap_urls = [f"{url}/sitemap.xml"]
+            sitemap_paths = []
+            for sitemap_url in sitemap_urls[:self.max_sitemaps]:
+                if urlparse(sitemap_url).netloc.lower() != host:
+                    continue
+                sitemap_paths.extend(self.fetch_document(sitemap_url, lambda text: parse_sitemap(text, host)[:self.max_sitemap_paths]))
+            paths = list(dict.fromkeys(disallowed_paths + sitemap_paths[:self.max_sitemap_paths]))
+            span['paths'] = len(paths)
+        return paths
+
+    def submit(self, url, callback):
+        # callback(paths) runs in the worker once the documents for url are fetched,
+        # so the returned future is only done when the callback finished too
+        def job():
+            try:
+                paths = self.fetch(url)
+            except Exception:
+                paths = []
+            callback(paths)
+        return self.executor.submit(job)
+
+    def save(self):
+        if not self.cache_path:
+            return
+        os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+        with self.lock:
+            data = dict(self.cache)
+        temp_path = f"{self.cache_path}.{os.getpid()}.tmp"
+        with open(temp_path, 'w') as cache_file:
+            json.dump(data, cache_file)
+        os.replace(temp_path, self.cache_path)
+
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.save()
+
+# Statuses ffuf matches by default; baselines with any other status need no filter
+DEFAULT_MATCH_STATUSES = set(range(200, 300)) | {301, 302, 307, 401, 403, 405, 500}
+
+def ffuf_match_statuses(ffuf_args):
+    # Statuses the ffuf passes match: the user's -mc ('all' for every status), or ffuf's defaults
+    value = get_ffuf_option(ffuf_args, '-mc')
+    if value and value.strip().lower() == 'all':
+        return set(range(100, 600))
+    return parse_number_list(value) or DEFAULT_MATCH_STATUSES
+
+def response_fingerprint(response, token):
+    # Counted the way ffuf counts them, so the values work as -fs/-fw/-fl filters
+    body = response.content
+    location = response.headers.get('Location', '').replace(token, '{token}')
+    return {
+        'status': response.status_code,
+        'size': len(body),
+        'words': body.count(b' ') + 1,
+        'lines': body.count(b'\n') + 1,
+        'redirect': location,
+    }
+
+def ffuf_headers(ffuf_args):
+    # The -H 'Name: value' headers of the user's ffuf arguments
+    return [ffuf_args[i + 1] for i, arg in enumerate(ffuf_args[:-1]) if arg == '-H']
+
+def set_session_headers(session, headers):
+    # Makes a requests session send the user's -H headers, as the ffuf passes do
+    for header in headers:
+        name, _, value = header.partition(':')
+        if name.strip():
+            session.headers[name.strip()] = value.strip()
+
+class Calibrator:
+    # Learns what a host answers for paths that do not exist, once per TTL, and turns
+    # stable answers into ffuf filters. Every probe uses a random name of a different
+    # length, so pages reflecting the requested path are caught by words/lines rather than size.
+    probe_lengths = (8, 16, 24)
+
+    def __init__(self, cache_dir, ttl=86400, workers=8, timeout=5, headers=(), match_statuses=None, context=None):
+        self.ttl = ttl
+        self.timeout = timeout
+        self.context = context
+        self.session = requests.Session()
+        self.session.verify = False
+        set_session_headers(self.session, headers)
+        # Answers can depend on the headers (cookies, auth), so they are part of the cache key
+        self.headers_key = hashlib.sha1('\n'.join(sorted(headers)).encode()).hexdigest()[:12] if headers else None
+        # A baseline only needs a filter when its status is matched (the user's -mc), so that too
+        self.match_statuses = match_statuses or DEFAULT_MATCH_STATUSES
+        self.match_key = None
+        if self.match_statuses != DEFAULT_MATCH_STATUSES:
+            self.match_key = hashlib.sha1(','.join(str(status) for status in sorted(self.match_statuses)).encode()).hexdigest()[:12]
+        adapter = HTTPAdapter(pool_connections=workers, pool_maxsize=workers)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.workers = workers
+        self.lock = threading.Lock()
+        self.cache_path = os.path.join(cache_dir, 'calibration.json') if cache_dir else None
+        self.cache = {}
+        if self.cache_path and os.path.exists(self.cache_path):
+            try:
+                with open(self.cache_path, 'r') as cache_file:
+                    self.cache = json.load(cache_file)
+            except (OSError, ValueError):
+                self.cache = {}
+
+    def probe(self, url, suffix, length):
+        token = ''.join(random.choice('abcdefghijklmnopqrstuvwxyz0123456789') for _ in range(length))
+        try:
+            response = self.session.get(f"{url}/{token}{suffix}", allow_redirects=False, timeout=self.timeout)
+        except requests.RequestException:
+            return None
+        return response_fingerprint(response, token)
+
+    def baseline_filters(self, fingerprints):
+        # Filters for one group of probes, {} when no filter is needed, None when unstable
+        if any(fingerprint is None for fingerprint in fingerprints):
+            return None
+        statuses = {fingerprint['status'] for fingerprint in fingerprints}
+        if len(statuses) > 1:
+            return None
+        if statuses.pop() not in self.match_statuses:
+            return {}
+        for key, option in (('size', '-fs'), ('words', '-fw'), ('lines', '-fl')):
+            values = {fingerprint[key] for fingerprint in fingerprints}
+            if len(values) == 1:
+                return {option: values.pop()}
+        return None
+
+    def calibrate(self, url, extensions):
+        # Returns {'filters': {option: [values]}, 'stable': bool, 'baselines': [...]} for url
+        url = url.strip().rstrip('/')
+        key = f"{url}|{','.join(extensions)}"
+        if self.headers_key:
+            key += f"|{self.headers_key}"
+        if self.match_key:
+            key += f"|mc={self.match_key}"
+        with self.lock:
+            entry = self.cache.get(key)
+        now = time.time()
+        if entry and now - entry['calibrated'] < self.ttl:
+            return entry
+        suffixes = [''] + list(extensions)
+        jobs = [(suffix, length) for suffix in suffixes for length in self.probe_lengths]
+        with trace_span(self.context, 'calibrate', url, profile=True, probes=len(jobs)):
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                fingerprints = list(executor.map(lambda job: self.probe(url, *job), jobs))
+        filters = {}
+        stable = True
+        baselines = []
+        for i, suffix in enumerate(suffixes):
+            group = fingerprints[i * len(self.probe_lengths):(i + 1) * len(self.probe_lengths)]
+            baselines.append({'suffix': suffix, 'responses': group})
+            group_filters = self.baseline_filters(group)
+            if group_filters is None:
+                stable = False
+                continue
+            for option, value in group_filters.items():
+                if value not in filters.setdefault(option, []):
+                    filters[option].append(value)
+        entry = {'calibrated': now, 'filters': filters, 'stable': stable, 'baselines': baselines}
+        with self.lock:
+            self.cache[key] = entry
+        return entry
+
+    def save(self):
+        if not self.cache_path:
+            return
+        os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+        with self.lock:
+            data = dict(self.cache)
+        temp_path = f"{self.cache_path}.{os.getpid()}.tmp"
+        with open(temp_path, 'w') as cache_file:
+            json.dump(data, cache_file)
+        os.replace(temp_path, self.cache_path)
+
+    def close(self):
+        self.save()
+
+def calibrated_args(calibration, ffuf_args):
+    # The user's ffuf arguments with the calibration filters added, merged into filters of the same kind
+    if not calibration['stable']:
+        # No consistent baseline, ffuf has to calibrate itself
+        return ffuf_args + ['-ac']
+    for option, values in calibration['filters'].items():
+        values = [str(value) for value in values]
+        user_value = get_ffuf_option(ffuf_args, option)
+        if user_value:
+            values = [user_value] + values
+        ffuf_args = set_ffuf_option(ffuf_args, option, ','.join(values))
+    return ffuf_args
+
+title_pattern = re.compile(r'<title[^>]*>(.*?)</title>', re.IGNORECASE | re.DOTALL)
+
+def output_prefix(url):
+    # Output files of a target start with this name, as written by process_url
+    parsed_url = urlparse(url.strip().rstrip('/'))
+    domain = parsed_url.netloc or parsed_url.path
+    return domain.replace(':', '_').replace('/', '_')
+
+def output_files(prefix):
+    # Output files of the target with this prefix: the prefix, the date stamp, then the pass,
+    # so that the prefix example.com does not also pick up the files of example.com_8443
+    pattern = re.compile(re.escape(prefix) + r'_\d{8}(_[^/]*)?\.json')
+    return [path for path in glob.glob(f"{glob.escape(prefix)}_[0-9]*.json") if pattern.fullmatch(path)]
+
+class Deduplicator:
+    # Groups targets served by the same backend (parked domains, CDN defaults, shared load
+    # balancers) by fingerprinting the root page, two random paths, a few stable headers and
+    # the TLS certificate. Only the first target of a group is scanned and its findings are
+    # copied to the other members. The groups are built fresh every run, a backend may have
+    # changed since the last one; the JSON file only records the mapping of the current run.
+    probe_lengths = (12, 20)
+    fingerprint_headers = ('server', 'x-powered-by', 'content-type')
+
+    def __init__(self, mapping_path, workers=20, timeout=5, headers=(), context=None):
+        self.mapping_path = mapping_path
+        self.timeout = timeout
+        self.context = context
+        self.session = requests.Session()
+        self.session.verify = False
+        set_session_headers(self.session, headers)
+        adapter = HTTPAdapter(pool_connections=workers, pool_maxsize=workers)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.lock = threading.Lock()
+        self.groups = {}
+        self.save()
+
+    def response_parts(self, response, host, token=None):
+        # Host names and the random path are replaced, so default pages naming their host still match
+        body = response.content
+        location = response.headers.get('Location', '')
+        for name, placeholder in ((host, b'{host}'), (host.split(':')[0], b'{host}'), (token, b'{token}')):
+            if name:
+                body = body.replace(name.encode(), placeholder)
+                location = location.replace(name, placeholder.decode())
+        title = title_pattern.search(body.decode('utf-8', 'replace'))
+        return {
+            'status': response.status_code,
+            'body': hashlib.sha1(body).hexdigest(),
+            'title': title.group(1).strip() if title else None,
+            'location': location,
+            'headers': {name: response.headers.get(name) for name in self.fingerprint_headers},
+            'cookies': sorted(response.cookies.keys()),
+        }
+
+    def certificate_hash(self, parsed_url):
+        if parsed_url.scheme != 'https':
+            return None
+        try:
+            pem = ssl.get_server_certificate((parsed_url.hostname, parsed_url.port or 443), timeout=self.timeout)
+        except (OSError, ValueError):
+            return None
+        return hashlib.sha256(ssl.PEM_cert_to_DER_cert(pem)).hexdigest()
+
+    def fingerprint(self, url):
+        # None when the target cannot be fingerprinted; such targets are always scanned
+        parsed_url = urlparse(url)
+        host = parsed_url.netloc.lower()
+        try:
+            parts = [self.response_parts(self.session.get(f"{url}/", allow_redirects=False, timeout=self.timeout), host)]
+            for length in self.probe_lengths:
+                token = ''.join(random.choice('abcdefghijklmnopqrstuvwxyz0123456789') for _ in range(length))
+                response = self.session.get(f"{url}/{token}", allow_redirects=False, timeout=self.timeout)
+                parts.append(self.response_parts(response, host, token))
+        except requests.RequestException:
+            return None
+        parts.append({'scheme': parsed_url.scheme, 'certificate': self.certificate_hash(parsed_url)})
+        return hashlib.sha1(json.dumps(parts, sort_keys=True).encode()).hexdigest()
+
+    def admit(self, url):
+        # True when url has to be scanned: it is the first of its group or could not be fingerprinted
+        url = url.strip().rstrip('/')
+        with trace_span(self.context, 'dedup', url, profile=True):
+            fingerprint = self.fingerprint(url)
+        if fingerprint is None:
+            return True
+        with self.lock:
+            group = self.groups.get(fingerprint)
+            if group is None:
+                self.groups[fingerprint] = {'representative': url, 'members': []}
+                self.save()
+                return True
+            if group['representative'] == url:
+                return True
+            if url not in group['members']:
+                group['members'].append(url)
+                self.save()
+            representative = group['representative']
+        print(f"Skipping {url}: same backend as {representative}, its findings will be copied.")
+        return False
+
+    def save(self):
+        temp_path = f"{self.mapping_path}.{os.getpid()}.tmp"
+        with open(temp_path, 'w') as mapping_file:
+            json.dump(self.groups, mapping_file, indent=1)
+        os.replace(temp_path, self.mapping_path)
+
+    def copy_findings(self, since):
+        # Copies output files the representatives wrote since `since` to every member,
+        # with URLs rewritten to the member
+        with self.lock:
+            groups = [dict(group) for group in self.groups.values() if group['members']]
+        for group in groups:
+            representative = group['representative']
+            prefix = output_prefix(representative)
+            for source_file in output_files(prefix):
+                if os.path.getmtime(source_file) < since:
+                    continue
+                for member in group['members']:
+                    target_file = output_prefix(member) + source_file[len(prefix):]
+                    with trace_span(self.context, 'output', member, profile=True, copied_from=source_file, bytes=os.path.getsize(source_file)):
+                        copy_findings(source_file, target_file, representative, member)
+                    print(f"Findings of {representative} copied to {target_file}")
+
+def copy_findings(source_file, target_file, source_url, target_url):
+    # Streams the results of an ffuf output into a copy for another URL of the same backend
+    source_host = urlparse(source_url).netloc
+    target_host = urlparse(target_url).netloc
+    temp_path = f"{target_file}.{os.getpid()}.tmp"
+    with open(source_file, 'r') as source, open(temp_path, 'w') as target:
+        target.write(f'{{"duplicate_of": {json.dumps(source_url)}, "results": [')
+        for i, result in enumerate(ResultsReader(source)):
+            for key in ('url', 'redirectlocation'):
+                if isinstance(result.get(key), str):
+                    result[key] = result[key].replace(source_url, target_url)
+            if result.get('host') == source_host:
+                result['host'] = target_host
+            target.write((',' if i else '') + json.dumps(result))
+        target.write(']}')
+    os.replace(temp_path, target_file)
+
+# Additional priority words provided by the user, without leading '/'
+USER_PRIORITY_WORDS = [
+    'wp-backup.sh',
+    'submit.sh',
+    'stage-deploy.sh',
+    'scripts/driverenv.sh',
+    's3.sh',
+    'run-deploy.sh',
+    'passwords.sh',
+    'm/index.php',
+    'library.sh',
+    'installer.sh',
+    'envvars.sh',
+    'driverenv.sh',
+    'driver.sh',
+    'docker/startup.sh',
+    'develop.sh',
+    'bucket.sh',
+    'aws_cli.sh',
+    'aws-env.sh',
+    'swagger.json',
+    'swagger.yaml',
+    'swagger-ui',
+    'api-docs',
+    'v2/api-docs',
+    'v3/api-docs',
+    'api',
+    'services',
+    'swagger',
+    'swagger/v1/swagger.json'
+]
+
+# Remove leading slashes and convert to lowercase
+USER_PRIORITY_WORDS = [word.lstrip('/').lower() for word in USER_PRIORITY_WORDS]
+
+def domain_keywords(domain):
+    # Every label of the domain, plain and as an archive name
     additional_keywords = set()
-    for part in domain_parts:
+    for part in domain.split('.'):
         if part:
             part_lower = part.lower()
             additional_keywords.add(part_lower)
@@ -27,32 +731,1632 @@ def process_url(url, args, ffuf_args, add_se=False):
             additional_keywords.add(f"{part_lower}.zip")
             additional_keywords.add(f"{part_lower}.tar.gz")
             additional_keywords.add(f"{part_lower}.7z")
+    return additional_keywords
 
-    robots_url = f"{url.rstrip('/')}/robots.txt"
-    disallowed_paths = []
+def build_prefix_words(disallowed_paths, additional_keywords, user_priority_words, priority_wordlist=None):
+    prefix_words = []
+    scanned_paths = set()  # Track duplicates within this URL
+
+    # First, add disallowed paths and additional keywords, then the user-provided priority words
+    for word in list(disallowed_paths) + list(additional_keywords) + list(user_priority_words):
+        word = word.strip().lower()
+        if word and word not in scanned_paths:
+            prefix_words.append(word)
+            scanned_paths.add(word)
+
+    # Add words from the user-provided priority wordlist
+    if priority_wordlist:
+        try:
+            with open(priority_wordlist, 'r') as priority_wordlist_file:
+                for line in priority_wordlist_file:
+                    word = line.strip().lower()
+                    if word and word not in scanned_paths:
+                        prefix_words.append(word)
+                        scanned_paths.add(word)
+        except FileNotFoundError:
+            print(f"Priority wordlist file not found: {priority_wordlist}")
+            sys.exit(1)
+    return prefix_words
+
+def word_hash(word):
+    return int.from_bytes(hashlib.blake2b(word.encode('utf-8', 'surrogateescape'), digest_size=8).digest(), 'little')
+
+class CompiledWordlist:
+    # A wordlist that has been lowercased, filtered by extension, deduplicated and shuffled.
+    # <key>.txt holds the body (config words, env words, then the shuffled rest),
+    # <key>.idx the sorted 64-bit word hashes followed by the matching byte offsets,
+    # and <key>.json the metadata. Both files are memory-mapped, never loaded.
+    def __init__(self, base_path):
+        self.base_path = base_path
+        with open(f"{base_path}.json", 'r') as meta_file:
+            self.meta = json.load(meta_file)
+        self.words = self.meta['words']
+        self.size = self.meta['size']
+        self.other_offset = self.meta['other_offset']
+
+    def map(self, suffix):
+        with open(f"{self.base_path}{suffix}", 'rb') as mapped_file:
+            if not os.fstat(mapped_file.fileno()).st_size:
+                return b''
+            return mmap.mmap(mapped_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def find_lines(self, words, body):
+        # Byte ranges of the given words inside the body, found through the hash index
+        if not self.words:
+            return []
+        index = self.map('.idx')
+        view = memoryview(index)
+        hashes = view[:self.words * 8].cast('Q')
+        offsets = view[self.words * 8:].cast('Q')
+        ranges = []
+        try:
+            for word in words:
+                encoded = word.encode('utf-8', 'surrogateescape') + b'\n'
+                key = word_hash(word)
+                position = bisect.bisect_left(hashes, key)
+                while position < self.words and hashes[position] == key:
+                    offset = offsets[position]
+                    if body[offset:offset + len(encoded)] == encoded:
+                        ranges.append((offset, offset + len(encoded)))
+                        break
+                    position += 1
+        finally:
+            hashes.release()
+            offsets.release()
+            view.release()
+            index.close()
+        return sorted(ranges)
+
+    def contains(self, words):
+        # The words that are part of the body, in the given order
+        if not self.size:
+            return []
+        body = self.map('.txt')
+        try:
+            present = {body[start:end - 1].decode('utf-8', 'surrogateescape') for start, end in self.find_lines(words, body)}
+        finally:
+            body.close()
+        return [word for word in words if word in present]
+
+    def write_to(self, output, skip_words=(), rng=random, skip=None):
+        # Copy the body to output, leaving out skip_words and any word for which skip(word)
+        # is true. The shuffled section starts at a random line so targets do not all walk
+        # the same order.
+        if not self.size:
+            return
+        body = self.map('.txt')
+        try:
+            excluded = self.find_lines(skip_words, body)
+            start = self.other_offset
+            if self.other_offset < self.size:
+                start = body.find(b'\n', rng.randrange(self.other_offset, self.size) - 1) + 1
+                if start <= self.other_offset or start >= self.size:
+                    start = self.other_offset
+            segments = [(0, self.other_offset), (start, self.size), (self.other_offset, start)]
+            for segment_start, segment_end in segments:
+                position = segment_start
+                for excluded_start, excluded_end in excluded:
+                    if segment_start <= excluded_start < segment_end:
+                        copy_range(body, output, position, excluded_start, skip)
+                        position = excluded_end
+                copy_range(body, output, position, segment_end, skip)
+        finally:
+            body.close()
+
+def copy_range(body, output, start, end, skip=None, chunk_size=4 * 1024 * 1024):
+    while start < end:
+        stop = min(end, start + chunk_size)
+        if stop < end:
+            # Keep chunks on line boundaries
+            stop = body.find(b'\n', stop - 1) + 1
+        chunk = body[start:stop]
+        if skip:
+            chunk = b''.join(line + b'\n' for line in chunk.split(b'\n')[:-1] if not skip(line))
+        output.write(chunk)
+        start = stop
+
+# Serializes compilation of the same wordlist by concurrent targets
+compile_lock = threading.Lock()
+
+def compile_wordlist(wordlist_path, extensions, cache_dir, stream_memory=None, fp_rate=1e-6, exclude=None, seed=None):
+    # With exclude (another CompiledWordlist), the result only holds words that are not in it.
+    # With seed, a cached entry shuffled with a different seed is rebuilt, so a resumed run
+    # sees the same order as the original one.
+    stat = os.stat(wordlist_path)
+    key_source = f"{os.path.abspath(wordlist_path)}|{stat.st_mtime_ns}|{stat.st_size}|{','.join(sorted(extensions))}"
+    key = hashlib.sha1(key_source.encode()).hexdigest()
+    compiled_dir = os.path.join(cache_dir or tempfile.gettempdir(), 'wordlists')
+    base_path = os.path.join(compiled_dir, key)
+    with compile_lock:
+        if not compiled_matches(base_path, seed):
+            os.makedirs(compiled_dir, exist_ok=True)
+            if stream_memory:
+                build_compiled_wordlist_streaming(wordlist_path, extensions, base_path, stream_memory * 1024 * 1024, fp_rate, seed)
+            else:
+                build_compiled_wordlist(wordlist_path, extensions, base_path, seed)
+        compiled = CompiledWordlist(base_path)
+        if exclude is None:
+            return compiled
+        # Derived entries are keyed on both compiled files, so they are rebuilt when either changes
+        derived_path = f"{base_path}-{os.path.basename(exclude.base_path)}"
+        if not compiled_matches(derived_path, compiled.meta['seed']):
+            build_derived_wordlist(compiled, exclude, derived_path)
+        return CompiledWordlist(derived_path)
+
+def compiled_matches(base_path, seed=None):
+    if not os.path.exists(f"{base_path}.json"):
+        return False
+    if seed is None:
+        return True
+    with open(f"{base_path}.json", 'r') as meta_file:
+        meta = json.load(meta_file)
+    return meta['seed'] == seed
+
+def build_compiled_wordlist(wordlist_path, extensions, base_path, seed=None):
+    # Read the original wordlist and categorize the entries
+    words_starting_with_config = []
+    words_env = []
+    other_words = []
+    extension_suffixes = tuple(extensions)
+    with open(wordlist_path, 'r') as original_wordlist:
+        for line in original_wordlist:
+            word = line.strip().lower()
+            if word:
+                # Remove words that have extensions matching the specified ones
+                if word.endswith(extension_suffixes):
+                    continue
+                if word.startswith('config'):
+                    words_starting_with_config.append(word)
+                elif word in ['env', '.env']:
+                    words_env.append(word)
+                else:
+                    other_words.append(word)
+
+    # Remove duplicates while preserving order
+    words_starting_with_config = list(dict.fromkeys(words_starting_with_config))
+    words_env = list(dict.fromkeys(words_env))
+    other_words = list(dict.fromkeys(other_words))
+
+    # Randomize the order of the other words
+    if seed is None:
+        seed = random.randrange(2 ** 32)
+    random.Random(seed).shuffle(other_words)
+
+    write_compiled_wordlist(base_path, [words_starting_with_config, words_env], other_words, {
+        'source': os.path.abspath(wordlist_path),
+        'extensions': sorted(extensions),
+        'seed': seed,
+    })
+
+def write_compiled_wordlist(base_path, head_sections, other_words, meta):
+    # Writes body, index and metadata; the metadata file is written last and marks the entry as complete
+    encoded_words = []
+    for words in head_sections:
+        encoded_words.extend(word.encode('utf-8', 'surrogateescape') + b'\n' for word in words)
+    head_count = len(encoded_words)
+    encoded_words.extend(word.encode('utf-8', 'surrogateescape') + b'\n' for word in other_words)
+    offsets = list(itertools.accumulate(map(len, encoded_words), initial=0))
+    hashes = [int.from_bytes(hashlib.blake2b(encoded[:-1], digest_size=8).digest(), 'little') for encoded in encoded_words]
+    index = sorted(zip(hashes, offsets))
+    temp_suffix = f".{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(f"{base_path}.txt{temp_suffix}", 'wb') as body_file:
+        body_file.write(b''.join(encoded_words))
+    with open(f"{base_path}.idx{temp_suffix}", 'wb') as index_file:
+        index_file.write(array.array('Q', [entry[0] for entry in index]).tobytes())
+        index_file.write(array.array('Q', [entry[1] for entry in index]).tobytes())
+    meta = dict(meta, words=len(encoded_words), size=offsets[-1], other_offset=offsets[head_count])
+    with open(f"{base_path}.json{temp_suffix}", 'w') as meta_file:
+        json.dump(meta, meta_file)
+    for suffix in ('.txt', '.idx', '.json'):
+        os.replace(f"{base_path}{suffix}{temp_suffix}", f"{base_path}{suffix}")
+
+class BloomFilter:
+    # Sized for `capacity` entries at the given false positive rate. A false positive
+    # makes a word look already seen, so on average fp_rate of the unique words are dropped.
+    def __init__(self, capacity, fp_rate):
+        capacity = max(1, capacity)
+        self.size = max(64, int(-capacity * math.log(fp_rate) / (math.log(2) ** 2)))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def add(self, word):
+        # Returns True if the word was not in the filter yet
+        digest = hashlib.blake2b(word.encode('utf-8', 'surrogateescape'), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        second = int.from_bytes(digest[8:], 'little') | 1
+        added = False
+        for i in range(self.hashes):
+            position = (first + i * second) % self.size
+            mask = 1 << (position & 7)
+            if not self.bits[position >> 3] & mask:
+                self.bits[position >> 3] |= mask
+                added = True
+        return added
 
-    # Suppress warnings about unverified HTTPS requests
-    warnings.filterwarnings("ignore", category=InsecureRequestWarning)
+class CompiledWriter:
+    # Writes a compiled wordlist word by word with bounded memory. Index entries are
+    # range-partitioned by hash into spill files and sorted one partition at a time.
+    def __init__(self, base_path, work_dir, partitions):
+        self.base_path = base_path
+        self.work_dir = work_dir
+        self.partitions = partitions
+        self.temp_suffix = f".{os.getpid()}.{threading.get_ident()}.tmp"
+        self.body_file = open(f"{base_path}.txt{self.temp_suffix}", 'wb')
+        self.index_parts = [open(os.path.join(work_dir, f"index{i}"), 'w+b') for i in range(partitions)]
+        self.offset = 0
+        self.words = 0
+        self.other_offset = None
 
+    def add(self, word):
+        encoded = word.encode('utf-8', 'surrogateescape') + b'\n'
+        self.body_file.write(encoded)
+        key = int.from_bytes(hashlib.blake2b(encoded[:-1], digest_size=8).digest(), 'little')
+        self.index_parts[(key * self.partitions) >> 64].write(array.array('Q', (key, self.offset)).tobytes())
+        self.offset += len(encoded)
+        self.words += 1
+
+    def start_other(self):
+        # Marks where the shuffled section begins
+        self.other_offset = self.offset
+
+    def finish(self, meta):
+        self.body_file.close()
+        if self.other_offset is None:
+            self.other_offset = self.offset
+        # Sort the index one hash range at a time: hashes first, then the matching offsets
+        offsets_path = os.path.join(self.work_dir, 'offsets')
+        with open(f"{self.base_path}.idx{self.temp_suffix}", 'wb') as index_file, open(offsets_path, 'wb') as offsets_file:
+            for part in self.index_parts:
+                part.seek(0)
+                entries = array.array('Q')
+                entries.frombytes(part.read())
+                part.close()
+                os.remove(part.name)
+                hashes = entries[0::2]
+                offsets = entries[1::2]
+                del entries
+                order = sorted(range(len(hashes)), key=hashes.__getitem__)
+                index_file.write(array.array('Q', (hashes[i] for i in order)).tobytes())
+                offsets_file.write(array.array('Q', (offsets[i] for i in order)).tobytes())
+                del hashes, offsets, order
+        with open(f"{self.base_path}.idx{self.temp_suffix}", 'ab') as index_file, open(offsets_path, 'rb') as offsets_file:
+            shutil.copyfileobj(offsets_file, index_file)
+        os.remove(offsets_path)
+        meta = dict(meta, words=self.words, size=self.offset, other_offset=self.other_offset)
+        with open(f"{self.base_path}.json{self.temp_suffix}", 'w') as meta_file:
+            json.dump(meta, meta_file)
+        for suffix in ('.txt', '.idx', '.json'):
+            os.replace(f"{self.base_path}{suffix}{self.temp_suffix}", f"{self.base_path}{suffix}")
+
+def build_compiled_wordlist_streaming(wordlist_path, extensions, base_path, memory_limit, fp_rate, seed=None):
+    # Same output as build_compiled_wordlist with memory bounded by memory_limit bytes:
+    # - config* words keep their order and are deduplicated with a Bloom filter
+    # - other words are hash-partitioned into bucket files so duplicates meet in the same
+    #   bucket (exact dedup), then scattered into random buckets which are shuffled one at a
+    #   time and concatenated, which is a uniform shuffle
+    extension_suffixes = tuple(extensions)
+    if seed is None:
+        seed = random.randrange(2 ** 32)
+    rng = random.Random(seed)
+
+    # First pass only counts lines to size the buckets and the Bloom filter
+    total_lines = 0
+    config_lines = 0
+    with open(wordlist_path, 'r') as original_wordlist:
+        for line in original_wordlist:
+            total_lines += 1
+            if line.lstrip()[:6].lower() == 'config':
+                config_lines += 1
+    # Roughly 200 bytes per word while a bucket is deduplicated and shuffled in memory
+    bucket_count = min(256, max(1, -(-total_lines * 200 // memory_limit)))
+
+    work_dir = tempfile.mkdtemp(dir=os.path.dirname(base_path), prefix='build_')
     try:
-        response = requests.get(robots_url, timeout=5, verify=False)
-        if response.status_code == 200:
-            lines = response.text.splitlines()
-            for line in lines:
-                line = line.strip()
-                if line.lower().startswith('disallow:'):
-                    path = line[len('Disallow:'):].strip()
-                    if path:
-                        # Remove leading slash and any comments
-                        path = path.split('#')[0].strip().lstrip('/')
-                        if path:
-                            disallowed_paths.append(path.lower())  # Convert to lowercase
-    except requests.RequestException:
-        pass
+        def open_buckets(name):
+            return [open(os.path.join(work_dir, f"{name}{i}"), 'w+') for i in range(bucket_count)]
+
+        config_seen = BloomFilter(config_lines, fp_rate)
+        words_env = []
+        hash_buckets = open_buckets('hash')
+        with open(os.path.join(work_dir, 'config'), 'w') as config_file, open(wordlist_path, 'r') as original_wordlist:
+            for line in original_wordlist:
+                word = line.strip().lower()
+                if not word:
+                    continue
+                # Remove words that have extensions matching the specified ones
+                if word.endswith(extension_suffixes):
+                    continue
+                if word.startswith('config'):
+                    if config_seen.add(word):
+                        config_file.write(f"{word}\n")
+                elif word in ['env', '.env']:
+                    if word not in words_env:
+                        words_env.append(word)
+                else:
+                    hash_buckets[(word_hash(word) ^ seed) % bucket_count].write(f"{word}\n")
+        del config_seen
+
+        # Exact dedup per hash bucket, scattering the unique words into random buckets
+        random_buckets = open_buckets('random')
+        for bucket in hash_buckets:
+            bucket.seek(0)
+            for word in dict.fromkeys(line.rstrip('\n') for line in bucket):
+                random_buckets[rng.randrange(bucket_count)].write(f"{word}\n")
+            bucket.close()
+            os.remove(bucket.name)
+
+        writer = CompiledWriter(base_path, work_dir, bucket_count)
+        with open(os.path.join(work_dir, 'config'), 'r') as config_file:
+            for line in config_file:
+                writer.add(line.rstrip('\n'))
+        for word in words_env:
+            writer.add(word)
+        writer.start_other()
+        for bucket in random_buckets:
+            bucket.seek(0)
+            bucket_words = [line.rstrip('\n') for line in bucket]
+            bucket.close()
+            os.remove(bucket.name)
+            # Randomize the order of the other words
+            rng.shuffle(bucket_words)
+            for word in bucket_words:
+                writer.add(word)
+            del bucket_words
+        writer.finish({
+            'source': os.path.abspath(wordlist_path),
+            'extensions': sorted(extensions),
+            'seed': seed,
+            'streaming': True,
+            'bloom_fp_rate': fp_rate,
+        })
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+def build_derived_wordlist(source, exclude, base_path):
+    # Keeps the words of `source` (in its order) that are not in `exclude`, e.g. the larger
+    # wordlist minus everything the short scan already sent. Membership is checked against
+    # the sorted 64-bit hash index of `exclude`.
+    work_dir = tempfile.mkdtemp(dir=os.path.dirname(base_path), prefix='build_')
+    try:
+        exclude_hashes = array.array('Q')
+        if exclude.words:
+            with open(f"{exclude.base_path}.idx", 'rb') as index_file:
+                exclude_hashes.frombytes(index_file.read(exclude.words * 8))
+        writer = CompiledWriter(base_path, work_dir, max(1, min(256, source.words // 1000000 + 1)))
+        body = source.map('.txt')
+        try:
+            position = 0
+            while position < source.size:
+                if position == source.other_offset:
+                    writer.start_other()
+                end = body.find(b'\n', position)
+                encoded = body[position:end]
+                position = end + 1
+                key = int.from_bytes(hashlib.blake2b(encoded, digest_size=8).digest(), 'little')
+                found = bisect.bisect_left(exclude_hashes, key)
+                if found < len(exclude_hashes) and exclude_hashes[found] == key:
+                    continue
+                writer.add(encoded.decode('utf-8', 'surrogateescape'))
+        finally:
+            if source.size:
+                body.close()
+        if source.other_offset >= source.size:
+            writer.start_other()
+        writer.finish({
+            'source': source.meta['source'],
+            'extensions': source.meta['extensions'],
+            'seed': source.meta['seed'],
+            'excluded': exclude.meta['source'],
+        })
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+HIT_STATS_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS hits (
+    grp TEXT NOT NULL,
+    word TEXT NOT NULL,
+    hits INTEGER NOT NULL,
+    PRIMARY KEY (grp, word)
+);
+CREATE INDEX IF NOT EXISTS hits_rank ON hits(grp, hits);
+CREATE TABLE IF NOT EXISTS groups (
+    grp TEXT PRIMARY KEY,
+    targets INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS ingested (
+    path TEXT PRIMARY KEY,
+    mtime REAL NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS version (
+    id INTEGER PRIMARY KEY CHECK (id = 0),
+    version INTEGER NOT NULL
+);
+'''
+
+class HitStats:
+    # How often each word produced a finding, from past ffuf outputs, in <cache-dir>/hit_stats.db.
+    # Counts are kept for all targets ('all') and per technology group detected by httpx
+    # (e.g. php, tomcat, iis); a word counts once per output file. New outputs are added as
+    # passes finish, so the ranking improves during a run. Every change bumps a version number,
+    # so a learned order can be rebuilt from its seed as long as the statistics are unchanged.
+    min_hits = 2
+    min_group_targets = 5
+
+    def __init__(self, cache_dir, groups):
+        os.makedirs(cache_dir, exist_ok=True)
+        self.groups = groups
+        self.connection = sqlite3.connect(os.path.join(cache_dir, 'hit_stats.db'), timeout=60, check_same_thread=False)
+        self.connection.executescript(HIT_STATS_SCHEMA)
+        self.lock = threading.Lock()
+
+    def target_groups(self, technologies):
+        # 'all' plus the configured groups found in the target's httpx technologies
+        technologies = (technologies or '').lower()
+        return ['all'] + [group for group in self.groups if group in technologies]
+
+    def record(self, output_path, groups, extensions, count_target=True):
+        # Adds the findings of one ffuf output (None when the pass found nothing) to groups;
+        # count_target is False for passes of a target that was already counted
+        words = set()
+        if output_path:
+            stat = os.stat(output_path)
+            path = os.path.abspath(output_path)
+            with self.lock:
+                row = self.connection.execute('SELECT mtime, size FROM ingested WHERE path = ?', (path,)).fetchone()
+            if row and row[0] == stat.st_mtime and row[1] == stat.st_size:
+                return False
+            extension_suffixes = tuple(extensions)
+            with open(output_path, 'r') as output_file:
+                for result in ResultsReader(output_file):
+                    word = ((result.get('input') or {}).get('FUZZ') or '').strip().lower()
+                    for extension in extension_suffixes:
+                        if word.endswith(extension) and len(word) > len(extension):
+                            word = word[:-len(extension)]
+                            break
+                    if word:
+                        words.add(word)
+        with self.lock, self.connection:
+            if output_path:
+                self.connection.execute('INSERT OR REPLACE INTO ingested (path, mtime, size) VALUES (?, ?, ?)',
+                                        (path, stat.st_mtime, stat.st_size))
+            for group in groups:
+                if count_target:
+                    self.connection.execute('INSERT INTO groups (grp, targets) VALUES (?, 1) '
+                                            'ON CONFLICT(grp) DO UPDATE SET targets = targets + 1', (group,))
+                self.connection.executemany('INSERT INTO hits (grp, word, hits) VALUES (?, ?, 1) '
+                                            'ON CONFLICT(grp, word) DO UPDATE SET hits = hits + 1',
+                                            [(group, word) for word in words])
+            # The count of 'all' is not used in the ranking, an output without findings leaves it unchanged
+            if words or (count_target and any(group != 'all' for group in groups)):
+                self.connection.execute('INSERT INTO version (id, version) VALUES (0, 1) '
+                                        'ON CONFLICT(id) DO UPDATE SET version = version + 1')
+        return True
+
+    def version(self):
+        with self.lock:
+            row = self.connection.execute('SELECT version FROM version WHERE id = 0').fetchone()
+        return row[0] if row else 0
+
+    def learn_from(self, patterns, extensions):
+        # Past outputs of unknown technology only count for 'all'; unchanged files are skipped
+        files = sorted({path for pattern in patterns for path in glob.glob(pattern)})
+        learned = sum(1 for path in files if os.path.isfile(path) and self.record(path, ['all'], extensions))
+        print(f"Hit statistics: learned from {learned} new of {len(files)} output files.")
+
+    def ranking(self, group, limit, rng):
+        with self.lock:
+            rows = self.connection.execute('SELECT word, hits FROM hits WHERE grp = ? AND hits >= ? '
+                                           'ORDER BY hits DESC, word LIMIT ?', (group, self.min_hits, limit)).fetchall()
+        # Words with the same count are tried in random order
+        rng.shuffle(rows)
+        rows.sort(key=lambda row: -row[1])
+        return [word for word, hits in rows]
+
+    def head(self, groups, compiled, limit, rng):
+        # The highest-yield words of compiled for a target: its technology groups with enough
+        # history first, then the overall ranking
+        with self.lock:
+            targets = dict(self.connection.execute('SELECT grp, targets FROM groups').fetchall())
+        ranked = []
+        for group in [group for group in groups if group != 'all'] + ['all']:
+            if group != 'all' and targets.get(group, 0) < self.min_group_targets:
+                continue
+            ranked.extend(self.ranking(group, limit * 2, rng))
+        return compiled.contains(list(dict.fromkeys(ranked)))[:limit]
+
+    def close(self):
+        self.connection.close()
+
+# Extensions every scanned word is also tried with
+SCAN_EXTENSIONS = ['.php', '.aspx', '.jsp', '.html', '.js', '.json']
+
+# httpx technologies revealing the server-side platform that handles an extension
+EXTENSION_PLATFORMS = {
+    '.php': ('php', 'wordpress', 'drupal', 'joomla', 'laravel', 'magento', 'symfony', 'codeigniter', 'typo3',
+             'phpmyadmin', 'nextcloud', 'moodle'),
+    '.aspx': ('iis', 'asp.net', 'microsoft asp.net', 'sharepoint', 'dotnetnuke', 'umbraco', 'outlook web app'),
+    '.jsp': ('tomcat', 'java', 'jboss', 'wildfly', 'jetty', 'weblogic', 'websphere', 'glassfish', 'liferay',
+             'confluence', 'jira', 'spring'),
+}
+# Hosting that only serves files
+STATIC_HOSTING = ('amazon s3', 'github pages', 'gitlab pages', 'netlify', 'firebase hosting', 'azure blob storage')
+
+def technology_matches(technologies, keywords):
+    # Whole-name matches only, so 'java' does not match 'javascript'
+    return [keyword for keyword in keywords
+            if re.search(r'(?<![a-z0-9])' + re.escape(keyword) + r'(?![a-z0-9])', technologies or '')]
+
+class ExtensionLog:
+    # Every extension decision of the run as JSON lines: target, extension, keep or drop,
+    # the stage that decided it (tech, probe, scan) and why
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+
+    def record(self, url, extension, decision, stage, reason):
+        entry = {
+            'time': datetime.datetime.now().isoformat(timespec='seconds'),
+            'target': url,
+            'extension': extension,
+            'decision': decision,
+            'stage': stage,
+            'reason': reason,
+        }
+        with self.lock:
+            with open(self.path, 'a') as log_file:
+                log_file.write(json.dumps(entry) + '\n')
+
+def select_extensions(url, extensions, technologies, calibration=None):
+    # The extensions worth sending to a target. A random path with the extension answering
+    # unlike a plain random path shows a handler, and the extension is kept whatever httpx
+    # says; otherwise platform extensions are dropped on static hosting and when httpx
+    # identified a different platform. Returns (extensions, decisions).
+    baselines = {baseline['suffix']: baseline['responses'] for baseline in (calibration or {}).get('baselines', [])}
+
+    def shape(responses):
+        if not responses or any(response is None for response in responses):
+            return None
+        return ({response['status'] for response in responses}, {response['words'] for response in responses},
+                {response['lines'] for response in responses})
+
+    plain = shape(baselines.get(''))
+    platforms = {extension: technology_matches(technologies, keywords) for extension, keywords in EXTENSION_PLATFORMS.items()}
+    detected = sorted({keyword for keywords in platforms.values() for keyword in keywords})
+    static = technology_matches(technologies, STATIC_HOSTING)
+    selected = []
+    decisions = []
+    for extension in extensions:
+        probe = shape(baselines.get(extension))
+        if plain and probe and probe != plain:
+            decision = ('keep', 'probe', 'random paths with it answer unlike plain random paths, a handler exists')
+        elif extension not in EXTENSION_PLATFORMS:
+            decision = ('keep', 'tech', 'not tied to a server-side platform')
+        elif technologies is None:
+            decision = ('keep', 'tech', 'no httpx technology data')
+        elif static:
+            decision = ('drop', 'tech', f"static hosting ({', '.join(static)}) and no handler seen")
+        elif platforms[extension]:
+            decision = ('keep', 'tech', f"platform detected ({', '.join(platforms[extension])})")
+        elif detected:
+            decision = ('drop', 'tech', f"other platform detected ({', '.join(detected)}) and no handler seen")
+        else:
+            decision = ('keep', 'tech', 'platform unknown')
+        if decision[0] == 'keep':
+            selected.append(extension)
+        decisions.append((extension,) + decision)
+    return selected, decisions
+
+class ExtensionPruner:
+    # Watches the live results of a pass and drops extensions that carry no information:
+    # word + extension answering exactly like the plain word (the server ignores the
+    # extension), or nearly all results of the extension sharing one response (a wildcard
+    # for that extension the calibration did not catch)
+    min_results = 20
+    max_alike_ratio = 0.9
+
+    def __init__(self, url, extensions, extension_log, journal=None):
+        self.url = url
+        self.extensions = list(extensions)
+        self.extension_log = extension_log
+        self.journal = journal
+        self.lock = threading.Lock()
+        self.plain = {}
+        self.stats = {extension: {'results': 0, 'same_as_plain': 0, 'shapes': {}} for extension in extensions}
+
+    def split(self, word):
+        for extension in sorted(self.extensions, key=len, reverse=True):
+            if word.endswith(extension) and len(word) > len(extension):
+                return word[:-len(extension)], extension
+        return word, None
+
+    def add_result(self, result):
+        shape = (result.get('status'), result.get('length'), result.get('words'), result.get('lines'))
+        word, extension = self.split((result.get('input') or {}).get('FUZZ') or '')
+        with self.lock:
+            if extension is None:
+                self.plain[word] = shape
+                return
+            stats = self.stats[extension]
+            stats['results'] += 1
+            stats['shapes'][shape] = stats['shapes'].get(shape, 0) + 1
+            if self.plain.get(word) == shape:
+                stats['same_as_plain'] += 1
+
+    def evaluate(self):
+        # Extensions to drop now; they are removed from self.extensions
+        dropped = []
+        with self.lock:
+            for extension in list(self.extensions):
+                stats = self.stats[extension]
+                results = stats['results']
+                if results < self.min_results:
+                    continue
+                if stats['same_as_plain'] >= results * self.max_alike_ratio:
+                    reason = f"{stats['same_as_plain']} of {results} results answer like the plain word"
+                elif max(stats['shapes'].values()) >= results * self.max_alike_ratio:
+                    reason = f"{max(stats['shapes'].values())} of {results} results share one response"
+                else:
+                    continue
+                self.extensions.remove(extension)
+                dropped.append((extension, reason))
+        for extension, reason in dropped:
+            self.extension_log.record(self.url, extension, 'drop', 'scan', reason)
+        if dropped and self.journal:
+            self.journal.update(self.url, extensions=list(self.extensions))
+        return [extension for extension, reason in dropped]
+
+# Default of --tmpfs-max, in MB
+TMPFS_MAX_MB = 16
+
+def wordlist_temp_dir(size, tmpfs_max):
+    # Per-target wordlists of up to tmpfs_max bytes are written to tmpfs when it is available,
+    # larger ones to the normal temp dir: tmpfs is RAM, and parallel targets each hold a copy
+    if tmpfs_max and size <= tmpfs_max and os.path.isdir('/dev/shm') and os.access('/dev/shm', os.W_OK):
+        return '/dev/shm'
+    return None
+
+def write_target_wordlist(prefix_words, compiled, skip_words=(), tested=None, rng=random, offset=0, tmpfs_max=0):
+    # prefix_words first, then the compiled body without prefix_words and skip_words.
+    # With a TestedStore, words it already holds are left out of both.
+    # offset drops that many leading words, to resume an interrupted pass.
+    skip = tested.is_tested if tested else None
+    size = compiled.size + sum(len(word) + 1 for word in prefix_words)
+    with tempfile.NamedTemporaryFile(mode='wb', delete=False, dir=wordlist_temp_dir(size, tmpfs_max), prefix='wr_') as temp_wordlist:
+        for word in prefix_words:
+            encoded = word.encode('utf-8', 'surrogateescape')
+            if not (skip and skip(encoded)):
+                temp_wordlist.write(encoded + b'\n')
+        compiled.write_to(temp_wordlist, list(prefix_words) + list(skip_words), rng, skip)
+    if offset:
+        drop_leading_lines(temp_wordlist.name, offset)
+    return temp_wordlist.name
+
+def drop_leading_lines(path, count):
+    with open(path, 'rb') as source_file, tempfile.NamedTemporaryFile(mode='wb', delete=False, dir=os.path.dirname(path), prefix='wr_') as trimmed_file:
+        for _ in range(count):
+            if not source_file.readline():
+                break
+        shutil.copyfileobj(source_file, trimmed_file)
+    os.replace(trimmed_file.name, path)
+
+class TestedStore:
+    # Persistent per-target record of requests that completed in earlier runs, stored as a
+    # sorted array of 64-bit hashes of the requested word (and word + extension).
+    # The file is memory-mapped like the index of a CompiledWordlist, never loaded.
+    def __init__(self, cache_dir, target, extensions):
+        self.path = os.path.join(cache_dir, 'tested', f"{target}.bin")
+        self.extensions = [ext.encode() for ext in extensions]
+        self.mapped = None
+        self.hashes = self.load()
+
+    def load(self):
+        if not os.path.exists(self.path) or not os.path.getsize(self.path):
+            return array.array('Q')
+        with open(self.path, 'rb') as store_file:
+            self.mapped = mmap.mmap(store_file.fileno(), 0, access=mmap.ACCESS_READ)
+        return memoryview(self.mapped).cast('Q')
+
+    def release(self):
+        if self.mapped is not None:
+            self.hashes.release()
+            self.mapped.close()
+            self.mapped = None
+        self.hashes = array.array('Q')
+
+    def contains(self, encoded):
+        key = int.from_bytes(hashlib.blake2b(encoded, digest_size=8).digest(), 'little')
+        position = bisect.bisect_left(self.hashes, key)
+        return position < len(self.hashes) and self.hashes[position] == key
+
+    def is_tested(self, encoded):
+        # A word is done when it was sent on its own and with every extension of this pass
+        return self.contains(encoded) and all(self.contains(encoded + ext) for ext in self.extensions)
+
+    def record(self, wordlist_path, count=None):
+        # Adds every request of a completed pass over wordlist_path, or of its first count words.
+        # The sorted hashes of the pass are merged into the sorted store as it is rewritten: the
+        # stored runs between two new hashes are copied as they are.
+        keys = array.array('Q')
+        with open(wordlist_path, 'rb') as wordlist_file:
+            for line in itertools.islice(wordlist_file, count):
+                word = line.rstrip(b'\n')
+                for encoded in [word] + [word + ext for ext in self.extensions]:
+                    keys.append(int.from_bytes(hashlib.blake2b(encoded, digest_size=8).digest(), 'little'))
+        keys = array.array('Q', sorted(keys))
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        temp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, 'wb') as store_file:
+            start = 0
+            last = None
+            for key in keys:
+                if key == last:
+                    continue
+                last = key
+                position = bisect.bisect_left(self.hashes, key, start)
+                store_file.write(self.hashes[start:position])
+                start = position
+                if position == len(self.hashes) or self.hashes[position] != key:
+                    store_file.write(key.to_bytes(8, sys.byteorder))
+            store_file.write(self.hashes[start:])
+        self.release()
+        os.replace(temp_path, self.path)
+        self.hashes = self.load()
+
+class RunJournal:
+    # Records a list run so it can be picked up again with --resume: the command line, the
+    # shuffled input list and its seed, the target order, the wordlist shuffle seeds and the
+    # status of each target (pending, short_running, short_done, tail_running, tail_done,
+    # long_running, long_done, done, interrupted), with the word position a running or
+    # interrupted pass had reached.
+    # The file is an append-only JSON lines log, one record per target and per state change,
+    # compacted to one record per target when it is loaded.
+    # Word positions of running passes are written at most every position_interval seconds
+    position_interval = 30
+
+    def __init__(self, path, data):
+        self.path = path
+        self.data = data
+        self.lock = threading.Lock()
+        self.log_file = None
+        self.position_written = {}
+
+    def append(self, record):
+        # Called with self.lock held
+        if self.log_file is None:
+            self.log_file = open(self.path, 'a')
+        self.log_file.write(json.dumps(record) + '\n')
+        self.log_file.flush()
+
+    def replay(self, record):
+        kind = record.pop('record', None)
+        if kind == 'run':
+            self.data.update(record)
+        elif kind == 'wordlist':
+            self.data['wordlists'][record['path']] = record['seed']
+        elif kind == 'add':
+            if record['url'] not in self.data['targets']:
+                self.data['targets'][record['url']] = {'priority': record['priority'], 'status': 'pending'}
+                self.data['order'].append(record['url'])
+        elif kind == 'target':
+            self.data['targets'].setdefault(record.pop('url'), {'priority': 1}).update(record)
+        elif kind == 'directory':
+            self.data.setdefault('directories', {}).setdefault(record.pop('url'), {}).update(record)
+
+    def compact(self):
+        # Rewrites the log as the run record plus one record per wordlist, target and directory
+        with self.lock:
+            if self.log_file:
+                self.log_file.close()
+                self.log_file = None
+            records = [dict({key: value for key, value in self.data.items()
+                             if key not in ('targets', 'order', 'wordlists', 'directories')}, record='run')]
+            records += [{'record': 'wordlist', 'path': path, 'seed': seed} for path, seed in self.data['wordlists'].items()]
+            for url in self.data['order']:
+                records.append({'record': 'add', 'url': url, 'priority': self.data['targets'][url]['priority']})
+            records += [dict(state, record='target', url=url) for url, state in self.data['targets'].items()]
+            records += [dict(job, record='directory', url=url) for url, job in self.data.get('directories', {}).items()]
+            temp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(temp_path, 'w') as journal_file:
+                for record in records:
+                    journal_file.write(json.dumps(record) + '\n')
+            os.replace(temp_path, self.path)
+
+    def add_target(self, url, priority):
+        with self.lock:
+            if url not in self.data['targets']:
+                self.data['targets'][url] = {'priority': priority, 'status': 'pending'}
+                self.data['order'].append(url)
+                self.append({'record': 'add', 'url': url, 'priority': priority})
+
+    def set_probe_done(self):
+        with self.lock:
+            self.data['probe_done'] = True
+            self.append({'record': 'run', 'probe_done': True})
+
+    def set_quick_pass_done(self):
+        with self.lock:
+            self.data['quick_pass_done'] = True
+            self.append({'record': 'run', 'quick_pass_done': True})
+
+    def state(self, url):
+        with self.lock:
+            return dict(self.data['targets'].get(url, {}))
+
+    def update(self, url, **fields):
+        with self.lock:
+            self.data['targets'].setdefault(url, {'priority': 1}).update(fields)
+            self.append(dict(fields, record='target', url=url))
+            self.position_written[url] = time.time()
+
+    def update_position(self, url, **fields):
+        # Progress of a running pass; kept in memory, written every position_interval seconds
+        with self.lock:
+            self.data['targets'].setdefault(url, {'priority': 1}).update(fields)
+            now = time.time()
+            if now - self.position_written.get(url, 0) >= self.position_interval:
+                self.append(dict(fields, record='target', url=url))
+                self.position_written[url] = now
+
+    def is_done(self, url):
+        return self.state(url).get('status') == 'done'
+
+    def pending_targets(self):
+        with self.lock:
+            return [(self.data['targets'][url]['priority'], url) for url in self.data['order']
+                    if self.data['targets'][url]['status'] != 'done']
+
+    def add_directory(self, url, job):
+        with self.lock:
+            self.data.setdefault('directories', {})[url] = dict(job, status='queued')
+            self.append(dict(job, status='queued', record='directory', url=url))
+
+    def directory_done(self, url):
+        with self.lock:
+            if url in self.data.get('directories', {}):
+                self.data['directories'][url]['status'] = 'done'
+                self.append({'record': 'directory', 'url': url, 'status': 'done'})
+
+    def pending_directories(self):
+        # Directory jobs of --managed-recursion queued in an earlier run and not scanned yet
+        with self.lock:
+            return [(url, dict(job)) for url, job in self.data.get('directories', {}).items() if job['status'] != 'done']
+
+    def rng(self, url, pass_name):
+        # Per-target randomness (e.g. where the shuffled section starts) is derived from the run seed,
+        # separately per pass, so a run resumed at the long pass rebuilds the same long wordlist
+        return random.Random(f"{self.data['seed']}:{url}:{pass_name}")
+
+    def wordlist_seed(self, wordlist_path):
+        with self.lock:
+            return self.data['wordlists'].get(os.path.abspath(wordlist_path))
+
+    def record_wordlist_seed(self, wordlist_path, seed):
+        with self.lock:
+            if self.data['wordlists'].get(os.path.abspath(wordlist_path)) != seed:
+                self.data['wordlists'][os.path.abspath(wordlist_path)] = seed
+                self.append({'record': 'wordlist', 'path': os.path.abspath(wordlist_path), 'seed': seed})
+
+def create_journal(path, argv, seed, urls):
+    journal = RunJournal(path, {
+        'created': datetime.datetime.now().isoformat(timespec='seconds'),
+        'argv': argv,
+        'seed': seed,
+        'inputs': urls,
+        'probe_done': False,
+        'order': [],
+        'targets': {},
+        'wordlists': {},
+    })
+    journal.compact()
+    return journal
+
+def load_journal(path):
+    journal = RunJournal(path, {'order': [], 'targets': {}, 'wordlists': {}})
+    try:
+        with open(path, 'r') as journal_file:
+            for line in journal_file:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # A record cut short by a crash
+                    continue
+                journal.replay(record)
+    except OSError as e:
+        print(f"Could not read journal {path}: {e}")
+        sys.exit(1)
+    if 'argv' not in journal.data:
+        print(f"Could not read journal {path}: no run record")
+        sys.exit(1)
+    journal.compact()
+    return journal
+
+def ffuf_threads(ffuf_args):
+    # ffuf's -t value, 40 when not given
+    for i, arg in enumerate(ffuf_args):
+        if arg == '-t' and i + 1 < len(ffuf_args) and ffuf_args[i + 1].isdigit():
+            return int(ffuf_args[i + 1])
+    return 40
+
+class ScanMetrics:
+    # Counters of one ffuf pass against one target, from ffuf's progress line and live results
+    def __init__(self, url, pass_name):
+        self.url = url
+        self.pass_name = pass_name
+        self.started = time.time()
+        self.finished = None
+        self.state = 'running'
+        self.progress = {}
+        self.results = 0
+        # Requests and errors of earlier ffuf runs of an adaptive pass
+        self.earlier_requests = 0
+        self.earlier_errors = 0
+        self.lock = threading.Lock()
+
+    def new_segment(self):
+        self.earlier_requests += self.progress.get('position', 0)
+        self.earlier_errors += self.progress.get('errors', 0)
+        self.progress.clear()
+
+    def add_result(self, result):
+        with self.lock:
+            self.results += 1
+
+    def finish(self, state):
+        self.finished = time.time()
+        self.state = state
+
+    def snapshot(self):
+        elapsed = (self.finished or time.time()) - self.started
+        requests_sent = self.earlier_requests + self.progress.get('position', 0)
+        if self.state == 'running' and 'rate' in self.progress:
+            rate = self.progress['rate']
+        else:
+            rate = requests_sent / elapsed if elapsed > 0 else 0
+        return {
+            'target': self.url,
+            'pass': self.pass_name,
+            'state': self.state,
+            'elapsed': round(elapsed, 1),
+            'requests': requests_sent,
+            'total': self.earlier_requests + self.progress.get('total', 0),
+            'req_per_sec': round(rate, 1),
+            'errors': self.earlier_errors + self.progress.get('errors', 0),
+            'results': self.results,
+        }
+
+# Metrics of every pass in this run, in start order
+run_metrics = []
+run_metrics_lock = threading.Lock()
+
+def start_metrics(url, pass_name):
+    metrics = ScanMetrics(url, pass_name)
+    with run_metrics_lock:
+        run_metrics.append(metrics)
+    return metrics
+
+def write_metrics_file(path):
+    # JSON, or the Prometheus textfile format when path ends in .prom
+    with run_metrics_lock:
+        snapshots = [metrics.snapshot() for metrics in run_metrics]
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, 'w') as metrics_file:
+        if path.endswith('.prom'):
+            for name, field, description in [
+                ('wr_requests', 'requests', 'Requests sent by ffuf'),
+                ('wr_requests_per_second', 'req_per_sec', 'Request rate of the pass'),
+                ('wr_errors', 'errors', 'Errors reported by ffuf'),
+                ('wr_results', 'results', 'Results found'),
+                ('wr_elapsed_seconds', 'elapsed', 'Seconds since the pass started'),
+            ]:
+                metrics_file.write(f"# HELP {name} {description}\n# TYPE {name} gauge\n")
+                for snapshot in snapshots:
+                    target = snapshot['target'].replace('\\', '\\\\').replace('"', '\\"')
+                    metrics_file.write(f'{name}{{target="{target}",pass="{snapshot["pass"]}",state="{snapshot["state"]}"}} {snapshot[field]}\n')
+        else:
+            json.dump({'updated': datetime.datetime.now().isoformat(timespec='seconds'), 'passes': snapshots}, metrics_file, indent=1)
+    os.replace(temp_path, path)
+
+def print_metrics_summary():
+    with run_metrics_lock:
+        snapshots = [metrics.snapshot() for metrics in run_metrics]
+    if not snapshots:
+        return
+    width = max(len('Target'), max(len(snapshot['target']) for snapshot in snapshots))
+    print(f"\n{'Target':<{width}}  {'Pass':<5}  {'State':<11}  {'Elapsed':>8}  {'Requests':>9}  {'Req/s':>7}  {'Errors':>6}  {'Results':>7}")
+    for snapshot in snapshots:
+        print(f"{snapshot['target']:<{width}}  {snapshot['pass']:<5}  {snapshot['state']:<11}  {snapshot['elapsed']:>8}  "
+              f"{snapshot['requests']:>9}  {snapshot['req_per_sec']:>7}  {snapshot['errors']:>6}  {snapshot['results']:>7}")
+
+def parse_duration(value):
+    # "8h", "90m", "45s" or plain seconds
+    value = value.strip().lower()
+    units = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+    if value[-1:] in units:
+        return float(value[:-1]) * units[value[-1]]
+    return float(value)
+
+class BudgetAllocator:
+    # Splits the wall-clock deadline and/or total request budget of a run over its targets.
+    # When a target starts, it gets a share of what is left, weighted by its priority class
+    # (priority technologies count double) and by the yield (results per request) its class
+    # has shown so far, against all targets still to come. The short pass is cut to the
+    # share (word cutoff for requests, ffuf -maxtime for time) and the long pass only runs
+    # with what is left of it, cut to what the host's measured speed can do in that time.
+    # Requests sent are counted per target as its passes report them (count_requests), so
+    # the checks the scheduler makes every half second do not walk the run's metrics.
+    class_weights = {0: 2.0, 1: 1.0}
+    min_long_requests = 1000
+    min_long_seconds = 60
+
+    def __init__(self, seconds=None, requests_total=None, parallel=1, expected_targets=1):
+        self.deadline = time.time() + seconds if seconds else None
+        self.requests_total = requests_total
+        self.parallel = max(1, parallel)
+        self.expected_targets = expected_targets
+        self.lock = threading.Lock()
+        self.start_lock = threading.Lock()
+        self.scheduler = None
+        self.targets = {}
+        # Sum over started targets of max(allocation, requests sent)
+        self.committed = 0
+
+    def count_requests(self, url, metrics):
+        # Takes the current request count of one pass (a ScanMetrics) of a started target
+        requests_sent = metrics.snapshot()['requests']
+        with self.lock:
+            target = self.targets.get(url)
+            if target:
+                self.committed -= max(target['allocated'], target['used'])
+                target['used'] += requests_sent - target['passes'].get(metrics, 0)
+                target['passes'][metrics] = requests_sent
+                self.committed += max(target['allocated'], target['used'])
+
+    def used_requests(self, url):
+        with self.lock:
+            target = self.targets.get(url)
+            return target['used'] if target else 0
+
+    def class_yield_factor(self, priority):
+        # Results per request of the class against the whole run, bounded to 0.5-2
+        with run_metrics_lock:
+            snapshots = [metrics.snapshot() for metrics in run_metrics]
+        with self.lock:
+            priorities = {url: target['priority'] for url, target in self.targets.items()}
+        totals = {}
+        for snapshot in snapshots:
+            priority = priorities.get(snapshot['target'])
+            if priority is not None:
+                requests_sent, results = totals.get(priority, (0, 0))
+                totals[priority] = (requests_sent + snapshot['requests'], results + snapshot['results'])
+        all_requests = sum(requests_sent for requests_sent, results in totals.values())
+        all_results = sum(results for requests_sent, results in totals.values())
+        class_requests, class_results = totals.get(priority, (0, 0))
+        if not all_results or class_requests < 1000:
+            return 1.0
+        return min(2.0, max(0.5, (class_results / class_requests) / (all_results / all_requests)))
+
+    def weight(self, priority):
+        return self.class_weights.get(priority, 1.0) * self.class_yield_factor(priority)
+
+    def remaining_weight(self, priority):
+        # This target plus the queued ones, plus targets the probe has not delivered yet
+        pending = []
+        closed = True
+        if self.scheduler:
+            with self.scheduler.cond:
+                pending = [entry[0] for entry in self.scheduler.pending]
+                closed = self.scheduler.closed
+        with self.lock:
+            started = len(self.targets)
+        unknown = 0 if closed else max(0, self.expected_targets - started - len(pending))
+        weights = {p: self.weight(p) for p in set(pending) | {priority, 1}}
+        return weights[priority] + sum(weights[p] for p in pending) + unknown * weights[1], weights[priority]
+
+    def exhausted(self):
+        if self.deadline and time.time() >= self.deadline:
+            return True
+        if self.requests_total and self.remaining_requests() <= 0:
+            return True
+        return False
+
+    def remaining_requests(self):
+        # Started targets hold on to their unused allocation
+        with self.lock:
+            return self.requests_total - self.committed
+
+    def start(self, url, priority):
+        # Reserves the share of a target; returns False when nothing is left for it.
+        # Only one target is started at a time, so the shares handed out add up.
+        with self.start_lock:
+            if self.exhausted():
+                return False
+            total_weight, weight = self.remaining_weight(priority)
+            share = weight / total_weight
+            target = {'priority': priority, 'started': time.time(), 'allocated': 0, 'requests': None, 'seconds': None,
+                      'used': 0, 'passes': {}}
+            # Requests already sent to it in this run, e.g. by the quick pass
+            with run_metrics_lock:
+                earlier = [metrics for metrics in run_metrics if metrics.url == url]
+            for metrics in earlier:
+                target['passes'][metrics] = metrics.snapshot()['requests']
+                target['used'] += target['passes'][metrics]
+            if self.requests_total:
+                target['requests'] = int(self.remaining_requests() * share)
+                target['allocated'] = target['requests']
+            if self.deadline:
+                target['seconds'] = (self.deadline - time.time()) * min(1.0, self.parallel * share)
+            with self.lock:
+                if url in self.targets:
+                    old = self.targets[url]
+                    self.committed -= max(old['allocated'], old['used'])
+                self.targets[url] = target
+                self.committed += max(target['allocated'], target['used'])
+        parts = []
+        if target['requests'] is not None:
+            parts.append(f"{target['requests']} requests")
+        if target['seconds'] is not None:
+            parts.append(f"{int(target['seconds'])} s")
+        print(f"Budget share for {url}: {' / '.join(parts)}.")
+        return True
+
+    def short_limits(self, url, words_per_entry):
+        # (word cutoff, -maxtime) of the short pass, None for no limit
+        with self.lock:
+            target = self.targets.get(url)
+        if not target:
+            return None, None
+        max_words = target['requests'] // words_per_entry if target['requests'] is not None else None
+        max_time = int(target['seconds']) if target['seconds'] is not None else None
+        return max_words, max_time
+
+    def long_limits(self, url, words, words_per_entry=1):
+        # (word cutoff, -maxtime) of a pass after the short one (the long pass, or the words the
+        # short pass was cut off before), or None when the share does not allow one
+        with self.lock:
+            target = self.targets.get(url)
+        if not target:
+            return None, None
+        max_words = words
+        max_time = None
+        if target['requests'] is not None:
+            left = (target['requests'] - self.used_requests(url)) // words_per_entry
+            if left < min(self.min_long_requests // words_per_entry, words):
+                return None
+            max_words = min(max_words, left)
+        if target['seconds'] is not None:
+            elapsed = time.time() - target['started']
+            left = target['seconds'] - elapsed
+            if left < self.min_long_seconds:
+                return None
+            max_time = int(left)
+            # The host's speed in the short pass tells how far the long pass gets in that time
+            requests_sent = self.used_requests(url)
+            if requests_sent and elapsed > 0:
+                max_words = min(max_words, int(left * requests_sent / elapsed / words_per_entry))
+        return max_words, max_time
+
+    def finish(self, url):
+        # The unused part of the allocation goes back to the targets still to come
+        with self.lock:
+            target = self.targets.get(url)
+            if target:
+                self.committed -= max(target['allocated'], target['used'])
+                target['allocated'] = target['used']
+                self.committed += target['used']
+
+def truncate_lines(path, count, keep_tail=False):
+    # Keeps the first count lines of path. With keep_tail, the cut lines are moved to a new
+    # file in the temp dir whose path is returned (None when nothing was cut).
+    with open(path, 'rb+') as wordlist_file:
+        for _ in range(count):
+            if not wordlist_file.readline():
+                return None
+        tail_path = None
+        if keep_tail and wordlist_file.peek(1):
+            with tempfile.NamedTemporaryFile(mode='wb', delete=False, prefix='wr_tail_') as tail_file:
+                position = wordlist_file.tell()
+                shutil.copyfileobj(wordlist_file, tail_file)
+                wordlist_file.seek(position)
+            tail_path = tail_file.name
+        wordlist_file.truncate()
+    return tail_path
+
+def remove_file(path):
+    if path and os.path.exists(path):
+        os.remove(path)
+
+# Live findings from concurrent passes are written one whole line at a time
+output_lock = threading.Lock()
+
+def print_result(result):
+    status = result.get('status')
+    color = get_color_for_status(status) if isinstance(status, int) else RESET
+    with output_lock:
+        sys.stdout.write(f"{result.get('url')} {color}{status}{RESET} {result.get('lines')}\n")
+        sys.stdout.flush()
+
+def get_ffuf_option(command, option):
+    if option in command:
+        i = command.index(option)
+        if i + 1 < len(command):
+            return command[i + 1]
+    return None
+
+def set_ffuf_option(command, option, value):
+    # Replaces (or removes, with value None) an option of an ffuf command line
+    command = list(command)
+    while option in command:
+        i = command.index(option)
+        del command[i:i + 2]
+    if value is not None:
+        command.extend([option, str(value)])
+    return command
+
+# ffuf's default -mc, plus 429 so adaptive mode can see throttling
+ADAPTIVE_MATCHERS = '200-299,301,302,307,401,403,405,429,500'
+
+rate_settings_lock = threading.Lock()
+
+def load_rate_settings(cache_dir, host):
+    path = os.path.join(cache_dir, 'rate_settings.json')
+    with rate_settings_lock:
+        try:
+            with open(path, 'r') as settings_file:
+                return json.load(settings_file).get(host)
+        except (OSError, ValueError):
+            return None
+
+def save_rate_settings(cache_dir, host, threads, rate):
+    # Remembers the settings a pass finished with, as the starting point for the next run
+    path = os.path.join(cache_dir, 'rate_settings.json')
+    with rate_settings_lock:
+        try:
+            with open(path, 'r') as settings_file:
+                settings = json.load(settings_file)
+        except (OSError, ValueError):
+            settings = {}
+        settings[host] = {'threads': threads, 'rate': rate, 'updated': datetime.datetime.now().isoformat(timespec='seconds')}
+        os.makedirs(cache_dir, exist_ok=True)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, 'w') as settings_file:
+            json.dump(settings, settings_file, indent=1)
+        os.replace(temp_path, path)
+
+class AdaptiveController:
+    # Decides per monitor window whether ffuf against one target should back off or ramp up,
+    # from the error ratio (ffuf counts timeouts as errors), the share of 429 responses and
+    # the response latency against the first windows of the run
+    min_window_requests = 50
+    max_error_ratio = 0.05
+    max_throttle_ratio = 0.01
+    max_latency_factor = 3
+    healthy_windows_to_ramp = 6
+
+    def __init__(self, threads, rate, max_threads):
+        self.threads = threads
+        self.rate = rate
+        self.max_threads = max_threads
+        self.lock = threading.Lock()
+        self.baseline_latency = None
+        self.restart_segment()
+
+    def restart_segment(self):
+        # ffuf's counters start from zero again after a restart
+        with self.lock:
+            self.last_position = 0
+            self.last_errors = 0
+            self.last_time = time.time()
+            self.throttled = 0
+            self.durations = []
+            self.healthy_windows = 0
+            self.skip_windows = 1
+
+    def add_result(self, result):
+        with self.lock:
+            if result.get('status') == 429:
+                self.throttled += 1
+            if isinstance(result.get('duration'), (int, float)):
+                self.durations.append(result['duration'])
+
+    def evaluate(self, progress):
+        # Returns 'backoff', 'rampup' or None and adjusts threads/rate accordingly
+        with self.lock:
+            now = time.time()
+            position = progress.get('position', 0)
+            errors = progress.get('errors', 0)
+            requests_sent = position - self.last_position
+            error_count = errors - self.last_errors
+            if requests_sent < self.min_window_requests and error_count < self.min_window_requests:
+                return None
+            observed_rate = requests_sent / max(now - self.last_time, 0.001)
+            throttled = self.throttled
+            durations = sorted(self.durations)
+            self.last_position = position
+            self.last_errors = errors
+            self.last_time = now
+            self.throttled = 0
+            self.durations = []
+            if self.skip_windows:
+                # The first window after a (re)start includes ffuf's warm-up
+                self.skip_windows -= 1
+                return None
+            latency = durations[len(durations) // 2] if durations else None
+            if latency and self.baseline_latency is None:
+                self.baseline_latency = latency
+            error_ratio = error_count / max(1, requests_sent)
+            throttle_ratio = throttled / max(1, requests_sent)
+            slow = latency and self.baseline_latency and latency > self.baseline_latency * self.max_latency_factor
+            if error_ratio > self.max_error_ratio or throttle_ratio > self.max_throttle_ratio or slow:
+                self.threads = max(1, self.threads // 2)
+                rate = max(1, int(observed_rate * 0.7))
+                self.rate = min(self.rate, rate) if self.rate else rate
+                self.healthy_windows = 0
+                return 'backoff'
+            self.healthy_windows += 1
+            if self.healthy_windows >= self.healthy_windows_to_ramp and self.threads < self.max_threads:
+                self.threads = min(self.max_threads, max(self.threads + 1, int(self.threads * 1.5)))
+                if self.rate:
+                    self.rate = int(self.rate * 1.5)
+                self.healthy_windows = 0
+                return 'rampup'
+            return None
+
+def copy_from_line(path, count):
+    # New temporary wordlist with the first `count` lines of path left out
+    with open(path, 'rb') as source_file, tempfile.NamedTemporaryFile(mode='wb', delete=False, dir=os.path.dirname(path), prefix='wr_') as copy_file:
+        for _ in range(count):
+            if not source_file.readline():
+                break
+        shutil.copyfileobj(source_file, copy_file)
+    return copy_file.name
+
+def write_ffuf_output(output_filename, commandline, results_path, drop_statuses=()):
+    # Writes results collected as JSON lines in ffuf's -of json layout; nothing when there are none (-or)
+    count = 0
+    temp_path = f"{output_filename}.{os.getpid()}.tmp"
+    with open(results_path, 'r') as results_file, open(temp_path, 'w') as output_file:
+        output_file.write(f'{{"commandline": {json.dumps(commandline)}, '
+                          f'"time": {json.dumps(datetime.datetime.now().astimezone().isoformat(timespec="seconds"))}, "results": [')
+        for line in results_file:
+            result = json.loads(line)
+            if result.get('status') in drop_statuses:
+                continue
+            output_file.write((',' if count else '') + line.rstrip('\n'))
+            count += 1
+        output_file.write('], "config": {}}')
+    if count:
+        os.replace(temp_path, output_filename)
+    else:
+        os.remove(temp_path)
+
+def run_adaptive(url, args, ffuf_command, temp_wordlist_path, detach, metrics, monitor, on_result, segment, pruner=None,
+                 context=None):
+    # Runs an ffuf pass that is restarted from the word it reached when its settings change.
+    # Under AdaptiveController (--adaptive), a struggling target (errors, timeouts, 429s,
+    # latency) is stopped, paused for a cool-down and restarted with fewer threads and a rate
+    # limit; healthy targets are restarted with more. With an ExtensionPruner, the pass is
+    # restarted without the extensions it drops. Results are collected from the live output,
+    # so the -o file covers all segments.
+    progress = metrics.progress
+    host = urlparse(url).netloc.lower()
+    controller = None
+    if args.adaptive:
+        user_threads = get_ffuf_option(ffuf_command, '-t')
+        user_rate = get_ffuf_option(ffuf_command, '-rate')
+        remembered = load_rate_settings(args.cache_dir, host) or {}
+        threads = remembered.get('threads') or (int(user_threads) if user_threads and user_threads.isdigit() else 40)
+        rate = remembered.get('rate') or (int(user_rate) if user_rate and user_rate.isdigit() and int(user_rate) > 0 else None)
+        controller = AdaptiveController(threads, rate, args.adaptive_max_threads)
+        if remembered:
+            print(f"Adaptive rate for {url}: starting from remembered settings, {threads} threads, rate {rate or 'unlimited'}.")
+
+    output_filename = get_ffuf_option(ffuf_command, '-o')
+    ffuf_command = set_ffuf_option(ffuf_command, '-o', None)
+    ffuf_command = set_ffuf_option(ffuf_command, '-of', None)
+    if '-or' in ffuf_command:
+        ffuf_command.remove('-or')
+    added_matchers = controller and '-mc' not in ffuf_command
+    if added_matchers:
+        ffuf_command = set_ffuf_option(ffuf_command, '-mc', ADAPTIVE_MATCHERS)
+
+    results_file = tempfile.NamedTemporaryFile(mode='w', delete=False, prefix='wr_results_')
+
+    def collect(result):
+        if controller:
+            controller.add_result(result)
+        if pruner:
+            pruner.add_result(result)
+        if added_matchers and result.get('status') == 429:
+            return
+        results_file.write(json.dumps(result) + '\n')
+        on_result(result)
+
+    # A -maxtime (the budget's time share) covers all segments together
+    max_time = get_ffuf_option(ffuf_command, '-maxtime')
+    started = time.time()
+    segment_path = temp_wordlist_path
+    try:
+        while True:
+            command = set_ffuf_option(ffuf_command, '-w', segment_path)
+            if max_time:
+                left = int(max_time) - int(time.time() - started)
+                if left < 1:
+                    print(f"Time share for {url} used up at word {segment['base']}.")
+                    progress['time_up'] = True
+                    break
+                command = set_ffuf_option(command, '-maxtime', left)
+            if controller:
+                command = set_ffuf_option(command, '-t', controller.threads)
+                command = set_ffuf_option(command, '-rate', controller.rate)
+                segment['threads'] = controller.threads
+            decision = {}
+
+            def adaptive_monitor(process):
+                monitor(process)
+                action = controller.evaluate(progress) if controller else None
+                dropped = pruner.evaluate() if pruner else []
+                if action or dropped:
+                    decision['action'] = action or 'prune'
+                    decision['dropped'] = dropped
+                    stop_process(process)
+
+            completed = run_ffuf(command, detach, progress, adaptive_monitor, on_result=collect)
+            if not completed or 'action' not in decision:
+                break
+            # Continue from the word ffuf safely passed, in-flight requests are repeated
+            passed = max(0, progress.get('first_job_position', 0) - segment['threads']) // segment['words_per_entry']
+            segment['base'] += passed
+            if decision['dropped']:
+                ffuf_command = set_ffuf_option(ffuf_command, '-e', ','.join(pruner.extensions) or None)
+                segment['words_per_entry'] = 1 + len(pruner.extensions)
+                print(f"Extensions for {url}: dropped {', '.join(decision['dropped'])} as indistinguishable from the baseline, "
+                      f"continuing from word {segment['base']} with {', '.join(pruner.extensions) or 'no extensions'}.")
+            if decision['action'] != 'prune':
+                print(f"Adaptive rate for {url}: {decision['action']} to {controller.threads} threads, "
+                      f"rate {controller.rate or 'unlimited'}, continuing from word {segment['base']}.")
+            next_path = copy_from_line(segment_path, passed)
+            if segment_path != temp_wordlist_path:
+                os.remove(segment_path)
+            segment_path = next_path
+            metrics.new_segment()
+            if controller:
+                controller.restart_segment()
+            if decision['action'] == 'backoff':
+                # Give a struggling host a moment before the restart
+                stop_event.wait(args.adaptive_cooldown)
+            if stop_event.is_set():
+                completed = False
+                break
+    finally:
+        if segment_path != temp_wordlist_path:
+            os.remove(segment_path)
+        results_file.close()
+        if output_filename:
+            with trace_span(context, 'output', url, profile=True, bytes=os.path.getsize(results_file.name)):
+                write_ffuf_output(output_filename, ' '.join(ffuf_command), results_file.name)
+        os.remove(results_file.name)
+    if completed and controller:
+        save_rate_settings(args.cache_dir, host, controller.threads, controller.rate)
+    return completed
+
+def execute_pass(url, args, ffuf_command, temp_wordlist_path, detach, tested=None, journal=None,
+                 pass_name='short', offset=0, words_per_entry=1, threads=40, pruner=None, context=None):
+    # Runs one ffuf pass over temp_wordlist_path and removes the file afterwards; returns 'done',
+    # 'partial' when ffuf stopped before the end of the wordlist, 'failed' when it exited with an
+    # error before sending a request, or 'interrupt'.
+    # The journal is kept at the word position ffuf has safely passed, so an interrupted,
+    # crashed or cut pass can be resumed from there. In live mode (--live, --adaptive, or any
+    # concurrent run) ffuf prints -json lines that are shown as findings the moment they arrive.
+    metrics = start_metrics(url, pass_name)
+    progress = metrics.progress
+    live = args.live or args.adaptive or detach or pruner
+    # Words covered by earlier segments of a restarted pass, and the threads and requests per word of the current one
+    segment = {'base': 0, 'threads': threads, 'words_per_entry': words_per_entry}
+
+    def words_done():
+        # Requests still in flight when ffuf stopped are repeated, not skipped
+        position = progress.get('first_job_position', 0) - segment['threads']
+        return offset + segment['base'] + max(0, position // segment['words_per_entry'])
+
+    def monitor(process):
+        if context and context.budget:
+            context.budget.count_requests(url, metrics)
+        if journal:
+            journal.update_position(url, status=f"{pass_name}_running", **{'pass': pass_name, 'position': words_done()})
+        if args.metrics_file:
+            write_metrics_file(args.metrics_file)
+
+    # Time spent printing and counting live results, for the trace
+    output_seconds = [0.0]
+
+    def on_result(result):
+        started = time.time()
+        metrics.add_result(result)
+        print_result(result)
+        output_seconds[0] += time.time() - started
+
+    with trace_span(context, f"{pass_name}_scan", url, offset=offset) as span:
+        try:
+            finished = True
+            if not os.path.getsize(temp_wordlist_path):
+                print(f"No untested words left for {url}.")
+                completed = True
+            else:
+                if journal:
+                    journal.update(url, status=f"{pass_name}_running", **{'pass': pass_name, 'position': offset})
+                if live:
+                    ffuf_command = ffuf_command + ['-json']
+                if args.adaptive or pruner:
+                    completed = run_adaptive(url, args, ffuf_command, temp_wordlist_path, detach, metrics, monitor,
+                                             on_result, segment, pruner, context)
+                else:
+                    completed = run_ffuf(ffuf_command, detach, progress, monitor, on_result=on_result if live else None)
+                finished = completed and ffuf_finished(progress)
+            if completed and not finished:
+                # Only part of the wordlist was sent
+                if progress.get('time_up') or ('-maxtime' in ffuf_command and progress.get('returncode') == 0):
+                    print(f"Time share for {url} used up after {progress.get('position', 0)} of {progress.get('total', 0)} requests.")
+                else:
+                    print(f"ffuf stopped early for {url} (exit status {progress.get('returncode')}) after "
+                          f"{progress.get('position', 0)} of {progress.get('total', 0)} requests.")
+            if completed and tested:
+                if pruner:
+                    # Dropped extensions count as sent only for the words before the drop, not recorded
+                    tested.extensions = [extension.encode() for extension in pruner.extensions]
+                # A pass that stopped early only covers the words before the position it reached
+                tested.record(temp_wordlist_path, None if finished else words_done() - offset)
+        except KeyboardInterrupt:
+            completed = False
+        finally:
+            # Clean up the temporary wordlist file
+            os.remove(temp_wordlist_path)
+        metrics.finish(('done' if finished else 'partial') if completed else 'interrupted')
+        if context and context.budget:
+            context.budget.count_requests(url, metrics)
+        snapshot = metrics.snapshot()
+        span.update(state=snapshot['state'], requests=snapshot['requests'], errors=snapshot['errors'],
+                    results=snapshot['results'], output_seconds=round(output_seconds[0], 6))
+    if args.metrics_file:
+        write_metrics_file(args.metrics_file)
+    if journal:
+        if completed and finished:
+            journal.update(url, status=f"{pass_name}_done", position=0)
+        else:
+            # Words the tested store recorded are left out when the list is rebuilt, the resumed pass starts at its top
+            position = 0 if completed and tested else words_done()
+            journal.update(url, status='interrupted', position=position, **{'pass': pass_name})
+    if not completed:
+        return 'interrupt'
+    if not finished and not progress.get('position') and progress.get('returncode'):
+        return 'failed'
+    return 'done' if finished else 'partial'
+
+def process_url(url, args, ffuf_args, add_se=False, detach=False, robots_paths=None, journal=None, calibrator=None,
+                priority=1, context=None):
+    url = url.strip().rstrip('/')
+    url_with_fuzz = f"{url}/FUZZ"
+    context = context or RunContext()
+    budget = context.budget
+    hit_stats = context.hit_stats
+    directory_jobs = context.directory_jobs
+    extension_log = context.extension_log
+
+    # With a run budget, the target gets its share of what is left or waits for a later run
+    if budget and not budget.start(url, priority):
+        print(f"Budget used up, {url} is left for a later run.")
+        return 'skipped'
+
+    parsed_url = urlparse(url)
+    domain = parsed_url.netloc or parsed_url.path  # Adjusted to handle URLs without scheme
+    additional_keywords = domain_keywords(domain)
+
+    # Paths from robots.txt and sitemap.xml are harvested before the scan starts
+    disallowed_paths = robots_paths or []
 
     # Display the paths from robots.txt before scanning
     if disallowed_paths:
-        print(f"The following paths were found in robots.txt for {url} and will be included in the scan:")
+        print(f"The following paths were found in robots.txt/sitemap.xml for {url} and will be included in the scan:")
         for path in disallowed_paths:
             print(f"- {path}")
         print()
@@ -64,318 +2368,1333 @@ def process_url(url, args, ffuf_args, add_se=False):
             print(f"- {keyword}")
         print()
 
-    # Additional priority words provided by the user, without leading '/'
-    user_priority_words = [
-        'wp-backup.sh',
-        'submit.sh',
-        'stage-deploy.sh',
-        'scripts/driverenv.sh',
-        's3.sh',
-        'run-deploy.sh',
-        'passwords.sh',
-        'm/index.php',
-        'library.sh',
-        'installer.sh',
-        'envvars.sh',
-        'driverenv.sh',
-        'driver.sh',
-        'docker/startup.sh',
-        'develop.sh',
-        'bucket.sh',
-        'aws_cli.sh',
-        'aws-env.sh',
-        'swagger.json',
-        'swagger.yaml',
-        'swagger-ui',
-        'api-docs',
-        'v2/api-docs',
-        'v3/api-docs',
-        'api',
-        'services',
-        'swagger',
-        'swagger/v1/swagger.json'
-    ]
+    user_priority_words = USER_PRIORITY_WORDS
 
-    # Remove leading slashes and convert to lowercase
-    user_priority_words = [word.lstrip('/').lower() for word in user_priority_words]
+    # Where a resumed target picks up again
+    state = journal.state(url) if journal else {}
+    resume_pass = state.get('pass') if state.get('status') in ('short_running', 'tail_running', 'long_running', 'interrupted') else None
+    if state.get('status') in ('tail_done', 'long_running', 'long_done') or resume_pass == 'long':
+        start_pass = 'long'
+    elif state.get('status') == 'short_done' or resume_pass == 'tail':
+        start_pass = 'tail'
+    else:
+        start_pass = 'short'
+
+    # Technologies httpx detected, kept in the journal for a resumed run
+    technologies = context.target_technologies.get(url)
+    if journal:
+        if technologies is None:
+            technologies = state.get('technologies')
+        elif technologies != state.get('technologies'):
+            journal.update(url, technologies=technologies)
 
     # Get the list of extensions specified in ffuf command
-    extensions = ['.php', '.aspx', '.jsp', '.html', '.js', '.json']
-
-    # Build the combined wordlist according to the specified order
-    combined_wordlist = []
-
-    scanned_paths = set()  # Initialize scanned_paths here to track duplicates within this URL
-
-    # First, add disallowed paths and additional keywords
-    for path in disallowed_paths:
-        path = path.strip().lower()
-        if path not in scanned_paths:
-            combined_wordlist.append(path)
-            scanned_paths.add(path)
-    for keyword in additional_keywords:
-        keyword = keyword.strip().lower()
-        if keyword not in scanned_paths:
-            combined_wordlist.append(keyword)
-            scanned_paths.add(keyword)
-
-    # Add user-provided priority words
-    for word in user_priority_words:
-        word = word.strip().lower()
-        if word not in scanned_paths:
-            combined_wordlist.append(word)
-            scanned_paths.add(word)
+    extensions = list(SCAN_EXTENSIONS)
 
-    # Add words from the user-provided priority wordlist
-    if args.priority_wordlist:
-        try:
-            with open(args.priority_wordlist, 'r') as priority_wordlist_file:
-                for line in priority_wordlist_file:
-                    word = line.strip().lower()
-                    if word and word not in scanned_paths:
-                        combined_wordlist.append(word)
-                        scanned_paths.add(word)
-        except FileNotFoundError:
-            print(f"Priority wordlist file not found: {args.priority_wordlist}")
-            sys.exit(1)
+    # Responses of this host for paths that do not exist become filters for both passes;
+    # without a stable baseline ffuf falls back to its own auto calibration
+    calibration = None
+    if calibrator:
+        calibration = calibrator.calibrate(url, extensions)
+        if not calibration['stable']:
+            print(f"No stable baseline for {url}, using ffuf auto calibration.")
+        elif calibration['filters']:
+            filters = ' '.join(f"{option} {','.join(str(value) for value in values)}" for option, values in calibration['filters'].items())
+            print(f"Wildcard responses for {url} are filtered with {filters}.")
+        ffuf_args = calibrated_args(calibration, ffuf_args)
+    threads = ffuf_threads(ffuf_args)
 
-    # Read the original wordlist and categorize the entries
-    words_starting_with_config = []
-    words_env = []
-    other_words = []
+    # With --prune-extensions, only the extensions this target can handle are sent, from its
+    # technologies and the calibration probes; a resumed target keeps what it had come to
+    if extension_log:
+        if 'extensions' in state:
+            extensions = state['extensions']
+        else:
+            extensions, decisions = select_extensions(url, extensions, technologies, calibration)
+            for extension, decision, stage, reason in decisions:
+                extension_log.record(url, extension, decision, stage, reason)
+            if journal:
+                journal.update(url, extensions=extensions)
+        dropped = [extension for extension in SCAN_EXTENSIONS if extension not in extensions]
+        print(f"Extensions for {url}: {', '.join(extensions) or 'none'}" + (f" (dropped {', '.join(dropped)})." if dropped else "."))
+
+    # Robots/sitemap paths, domain keywords and priority words go first
+    prefix_words = build_prefix_words(disallowed_paths, additional_keywords, user_priority_words, args.priority_wordlist)
+
+    # The filtered and shuffled base wordlist is compiled once and shared by every target
     try:
-        with open(args.wordlist, 'r') as original_wordlist:
-            for line in original_wordlist:
-                word = line.strip().lower()
-                if word:
-                    # Remove words that have extensions matching the specified ones
-                    if any(word.endswith(ext) for ext in extensions):
-                        continue
-                    if word.startswith('config'):
-                        words_starting_with_config.append(word)
-                    elif word in ['env', '.env']:
-                        words_env.append(word)
-                    else:
-                        other_words.append(word)
+        with trace_span(context, 'wordlist_build', url, profile=True, wordlist=args.wordlist) as span:
+            compiled = compile_wordlist(args.wordlist, SCAN_EXTENSIONS, args.cache_dir, args.stream_build, args.bloom_fp_rate,
+                                        seed=journal.wordlist_seed(args.wordlist) if journal else None)
+            span['words'] = compiled.meta['words']
     except FileNotFoundError:
+        print(f"Wordlist file not found: {args.wordlist}")
         sys.exit(1)
+    if journal:
+        journal.record_wordlist_seed(args.wordlist, compiled.meta['seed'])
 
-    # Remove duplicates while preserving order
-    words_starting_with_config = list(dict.fromkeys(words_starting_with_config))
-    words_env = list(dict.fromkeys(words_env))
-    other_words = list(dict.fromkeys(other_words))
-
-    # Randomize the order of the other words
-    random.shuffle(other_words)
-
-    # Combine all words in the specified order
-    for word in words_starting_with_config:
-        if word not in scanned_paths:
-            combined_wordlist.append(word)
-            scanned_paths.add(word)
-    for word in words_env:
-        if word not in scanned_paths:
-            combined_wordlist.append(word)
-            scanned_paths.add(word)
-    for word in other_words:
-        if word not in scanned_paths:
-            combined_wordlist.append(word)
-            scanned_paths.add(word)
+    # With --learned-order, the words that produced findings on the most earlier targets (of the
+    # same technology where there is enough history) follow the prefix, the rest keeps its
+    # shuffled order. The journal keeps the seed of a target's head and the version of the hit
+    # statistics it was built from, so a resumed pass rebuilds the same order; when the statistics
+    # have changed since, the resumed pass starts again from its first word with a new head.
+    learned_groups = hit_stats.target_groups(technologies) if hit_stats else []
 
-    # Create a temporary wordlist file and write the combined wordlist
-    with tempfile.NamedTemporaryFile(mode='w+', delete=False) as temp_wordlist:
-        for word in combined_wordlist:
-            temp_wordlist.write(f"{word}\n")
-    temp_wordlist_path = temp_wordlist.name
+    def learned_head(key, compiled, pass_name):
+        if not hit_stats:
+            return []
+        # Read before the ranking, so statistics changing in between never go unnoticed on resume
+        version = hit_stats.version()
+        saved = state.get(key)
+        if saved and saved['version'] != version and resume_pass == pass_name and state.get('position'):
+            print(f"Hit statistics changed since {url} was interrupted, its {pass_name} scan starts again from the first word.")
+            state['position'] = 0
+        seed = saved['seed'] if saved and saved['version'] == version else random.randrange(2 ** 32)
+        prefix = set(prefix_words)
+        head = [word for word in hit_stats.head(learned_groups, compiled, args.learned_head, random.Random(seed)) if word not in prefix]
+        if journal and saved != {'seed': seed, 'version': version}:
+            journal.update(url, **{key: {'seed': seed, 'version': version}})
+        if head:
+            print(f"Learned order for {url}: {len(head)} high-yield words first ({', '.join(learned_groups)}).")
+        return head
 
     # Generate output filename
     date_str = datetime.datetime.now().strftime('%Y%m%d')
     safe_domain = domain.replace(':', '_').replace('/', '_')
-    output_filename = f"{safe_domain}_{date_str}.json"
 
-    # Short scan ffuf command with specified extensions
+    # Words cut from the short pass by the budget, sent after it while the share lasts
+    short_tail = state.get('short_tail')
+
+    if start_pass == 'short':
+        # Built first, a resumed pass whose learned order cannot be rebuilt starts from the top
+        head_words = prefix_words + learned_head('learned_head', compiled, 'short')
+        offset = state.get('position', 0) if resume_pass == 'short' else 0
+        # A resumed pass writes to its own file instead of overwriting the earlier results
+        output_filename = f"{safe_domain}_{date_str}_from{offset}.json" if offset else f"{safe_domain}_{date_str}.json"
+        if offset:
+            print(f"Resuming short scan for {url} from word {offset}.")
+
+        # With --tested-store, requests that completed in earlier runs against this target are left out
+        tested = TestedStore(args.cache_dir, safe_domain, extensions) if args.tested_store else None
+
+        # Create a temporary wordlist file with the prefix followed by the shared body,
+        # cut to the target's budget share (the prefix is always sent)
+        max_words, max_time = budget.short_limits(url, 1 + len(extensions)) if budget else (None, None)
+        with trace_span(context, 'wordlist_write', url, profile=True, pass_name='short', prefix_words=len(head_words)) as span:
+            temp_wordlist_path = write_target_wordlist(head_words, compiled, tested=tested,
+                                                       rng=journal.rng(url, 'short') if journal else random, offset=offset,
+                                                       tmpfs_max=args.tmpfs_max * 1024 * 1024)
+            if max_words is not None:
+                remove_file(short_tail)
+                short_tail = truncate_lines(temp_wordlist_path, max(max_words, len(head_words) - offset), keep_tail=True)
+                if journal:
+                    journal.update(url, short_tail=short_tail)
+            span['bytes'] = os.path.getsize(temp_wordlist_path)
+
+        # Short scan ffuf command with specified extensions
+        ffuf_command = [
+            'ffuf',
+            '-w', temp_wordlist_path,
+            '-u', url_with_fuzz,
+            '-c',
+        ]
+        # With --managed-recursion, found directories are queued as separate child scans instead
+        if not directory_jobs:
+            ffuf_command.extend(['-recursion', '-recursion-depth', '1'])
+        if extensions:
+            ffuf_command.extend(['-e', ','.join(extensions)])  # Use the extensions list
+
+        # If add_se is True, add '-se' to ffuf_command
+        if add_se:
+            ffuf_command.append('-se')
+
+        # Continue building ffuf_command
+        ffuf_command.extend([
+            '-o', output_filename,
+            '-of', 'json',
+            '-or'
+        ])
+        if max_time:
+            ffuf_command.extend(['-maxtime', str(max_time)])
+
+        # Append any additional ffuf arguments provided by the user
+        ffuf_command.extend(ffuf_args)
+
+        # Execute the ffuf command; extensions indistinguishable from the baseline are dropped on the way
+        pruner = ExtensionPruner(url, extensions, extension_log, journal) if extension_log and extensions else None
+        status = execute_pass(url, args, ffuf_command, temp_wordlist_path, detach, tested, journal,
+                              'short', offset, 1 + len(extensions), threads, pruner, context)
+        if status == 'interrupt':
+            print(f"\nScan interrupted for {url}.")
+            return 'interrupt'
+
+        # Check if there are findings in the output file
+        if os.path.exists(output_filename):
+            print(f"Findings saved to {output_filename}")
+            if directory_jobs:
+                directory_jobs.queue_from_output(url, output_filename, 1, priority)
+        if hit_stats:
+            hit_stats.record(output_filename if os.path.exists(output_filename) else None, learned_groups, SCAN_EXTENSIONS)
+        if status == 'failed':
+            return 'error'
+        if status == 'partial':
+            # Cut by ffuf itself (-se, -maxtime) or by an error part-way: the next passes still run
+            print(f"Scan of {url} stopped before the end of the wordlist, continuing with the next scan.")
+        if pruner:
+            extensions = pruner.extensions
+
+    # Words the budget cut from the short scan are sent next, with the short scan's extensions,
+    # as far as the target's share allows
+    if short_tail and start_pass != 'long':
+        if not os.path.exists(short_tail):
+            print(f"Words cut from the short scan of {url} are gone ({short_tail}), they are not sent.")
+        else:
+            with open(short_tail, 'rb') as tail_file:
+                tail_words = sum(1 for _ in tail_file)
+            limits = budget.long_limits(url, tail_words, 1 + len(extensions))
+            if limits is None:
+                print(f"Budget share of {url} is used up, skipping the rest of the short scan.")
+                remove_file(short_tail)
+                if journal:
+                    journal.update(url, status='done', short_tail=None)
+                return
+            max_words, max_time = limits
+            offset = state.get('position', 0) if resume_pass == 'tail' else 0
+            if offset:
+                print(f"Resuming the rest of the short scan for {url} from word {offset}.")
+            else:
+                print(f"\nContinuing the short scan of {url} with {tail_words} words cut by the budget...")
+            tested = TestedStore(args.cache_dir, safe_domain, extensions) if args.tested_store else None
+            temp_wordlist_path = copy_from_line(short_tail, offset)
+            if max_words is not None:
+                truncate_lines(temp_wordlist_path, max_words)
+            output_filename = f"{safe_domain}_{date_str}_tail_from{offset}.json" if offset else f"{safe_domain}_{date_str}_tail.json"
+            ffuf_command = ['ffuf', '-w', temp_wordlist_path, '-u', url_with_fuzz, '-c']
+            if not directory_jobs:
+                ffuf_command.extend(['-recursion', '-recursion-depth', '1'])
+            if extensions:
+                ffuf_command.extend(['-e', ','.join(extensions)])
+            if add_se:
+                ffuf_command.append('-se')
+            ffuf_command.extend(['-o', output_filename, '-of', 'json', '-or'])
+            if max_time:
+                ffuf_command.extend(['-maxtime', str(max_time)])
+            ffuf_command.extend(ffuf_args)
+            status = execute_pass(url, args, ffuf_command, temp_wordlist_path, detach, tested, journal,
+                                  'tail', offset, 1 + len(extensions), threads, context=context)
+            if status == 'interrupt':
+                print(f"\nScan interrupted for {url}.")
+                return 'interrupt'
+            if os.path.exists(output_filename):
+                print(f"Findings saved to {output_filename}")
+                if directory_jobs:
+                    directory_jobs.queue_from_output(url, output_filename, 1, priority)
+                if hit_stats:
+                    hit_stats.record(output_filename, learned_groups, SCAN_EXTENSIONS, count_target=False)
+            if status in ('partial', 'failed'):
+                print(f"Scan of {url} stopped before the end of the wordlist.")
+                return 'error'
+        remove_file(short_tail)
+        short_tail = None
+        if journal:
+            journal.update(url, short_tail=None)
+
+    # If the --long-test flag is not set, skip the longer scan; with a budget, the target's share decides
+    if not args.long_test and not budget:
+        print("Skipping longer scan. Use --long-test to perform both scans.")
+        if journal:
+            journal.update(url, status='done')
+        return
+
+    # Proceed to longer scan
+    print("\nStarting longer scan with larger wordlist...")
+
+    # Build the wordlist for the longer scan from the compiled larger wordlist, leaving out every
+    # word the short scan already sent (its plain request was made, with or without extensions).
+    try:
+        with trace_span(context, 'wordlist_build', url, profile=True, wordlist=args.larger_wordlist) as span:
+            compiled = compile_wordlist(args.larger_wordlist, SCAN_EXTENSIONS, args.cache_dir, args.stream_build, args.bloom_fp_rate,
+                                        exclude=compiled, seed=journal.wordlist_seed(args.larger_wordlist) if journal else None)
+            span['words'] = compiled.meta['words']
+    except FileNotFoundError:
+        print(f"Larger wordlist file not found: {args.larger_wordlist}")
+        sys.exit(1)
+    if journal:
+        journal.record_wordlist_seed(args.larger_wordlist, compiled.meta['seed'])
+
+    max_words, max_time = None, None
+    if budget:
+        limits = budget.long_limits(url, compiled.words)
+        if limits is None:
+            print(f"Budget share of {url} is used up, skipping longer scan.")
+            if journal:
+                journal.update(url, status='done')
+            return
+        max_words, max_time = limits
+
+    head_words = learned_head('learned_head_long', compiled, 'long')
+    offset = state.get('position', 0) if resume_pass == 'long' else 0
+    if offset:
+        print(f"Resuming longer scan for {url} from word {offset}.")
+    tested = TestedStore(args.cache_dir, safe_domain, []) if args.tested_store else None
+    with trace_span(context, 'wordlist_write', url, profile=True, pass_name='long', prefix_words=len(head_words)) as span:
+        temp_wordlist_path = write_target_wordlist(head_words, compiled, skip_words=prefix_words, tested=tested,
+                                                   rng=journal.rng(url, 'long') if journal else random, offset=offset,
+                                                   tmpfs_max=args.tmpfs_max * 1024 * 1024)
+        if max_words is not None:
+            truncate_lines(temp_wordlist_path, max_words)
+        span['bytes'] = os.path.getsize(temp_wordlist_path)
+
+    # Generate new output filename for the longer scan
+    output_filename = f"{safe_domain}_{date_str}_larger_from{offset}.json" if offset else f"{safe_domain}_{date_str}_larger.json"
+
+    # Large scan ffuf command without additional extensions, filtered by the calibration
+    # (ffuf's auto calibration without --no-calibrate or a stable baseline)
     ffuf_command = [
         'ffuf',
         '-w', temp_wordlist_path,
         '-u', url_with_fuzz,
         '-c',
-        '-recursion',
-        '-recursion-depth', '1',
-        '-e', ','.join(extensions),  # Use the extensions list
     ]
-
-    # If add_se is True, add '-se' to ffuf_command
-    if add_se:
-        ffuf_command.append('-se')
-
-    # Continue building ffuf_command
+    if not directory_jobs:
+        ffuf_command.extend(['-recursion', '-recursion-depth', '1'])
+    if not calibrator:
+        ffuf_command.append('-ac')  # Auto calibration
     ffuf_command.extend([
         '-o', output_filename,
         '-of', 'json',
         '-or'
     ])
+    if max_time:
+        ffuf_command.extend(['-maxtime', str(max_time)])
 
     # Append any additional ffuf arguments provided by the user
     ffuf_command.extend(ffuf_args)
 
     # Execute the ffuf command
-    try:
-        subprocess.run(ffuf_command)
-    except KeyboardInterrupt:
-        print("\nScan interrupted.")
+    status = execute_pass(url, args, ffuf_command, temp_wordlist_path, detach, tested, journal, 'long', offset, 1, threads,
+                          context=context)
+    if status == 'interrupt':
+        print(f"\nLonger scan interrupted for {url}.")
         return 'interrupt'
-    finally:
-        # Clean up the temporary wordlist file
-        os.remove(temp_wordlist_path)
 
-    # Check if there are findings in the output file
     if os.path.exists(output_filename):
-        print(f"Findings saved to {output_filename}")
+        print(f"Longer scan findings saved to {output_filename}")
+        if directory_jobs:
+            directory_jobs.queue_from_output(url, output_filename, 1, priority)
+        if hit_stats:
+            hit_stats.record(output_filename, learned_groups, SCAN_EXTENSIONS, count_target=False)
+    if status in ('partial', 'failed'):
+        print(f"Longer scan of {url} stopped before the end of the wordlist.")
+        return 'error'
+    if journal:
+        journal.update(url, status='done')
 
-    # If the --long-test flag is not set, skip the longer scan
-    if not args.long_test:
-        print("Skipping longer scan. Use --long-test to perform both scans.")
-        return
+# Directory names holding static assets, not descended into by --managed-recursion
+STATIC_DIRECTORIES = {
+    'css', 'styles', 'stylesheets', 'js', 'javascript', 'img', 'imgs', 'image', 'images', 'icons', 'icon',
+    'fonts', 'font', 'webfonts', 'static', 'assets', 'media', 'svg', 'pics', 'photos', 'thumbs', 'thumbnails',
+    'video', 'videos', 'audio', 'sounds', 'emoji', 'flags', 'sprites',
+}
+REDIRECT_STATUSES = (301, 302, 303, 307, 308)
 
-    # Proceed to longer scan
-    print("\nStarting longer scan with larger wordlist...")
+def scan_output(output_path):
+    # Number of results of an ffuf output and the directories among them: a redirect to the
+    # same URL with a trailing slash (what ffuf's own recursion follows), or a word ending in '/'
+    count = 0
+    directories = []
+    if not output_path or not os.path.exists(output_path):
+        return count, directories
+    with open(output_path, 'r') as output_file:
+        for result in ResultsReader(output_file):
+            count += 1
+            url = result.get('url') or ''
+            word = (result.get('input') or {}).get('FUZZ') or ''
+            status = result.get('status')
+            if status in REDIRECT_STATUSES and result.get('redirectlocation'):
+                if urljoin(url, result['redirectlocation']) == url.rstrip('/') + '/':
+                    directories.append(url.rstrip('/'))
+            elif word.endswith('/') and status in (200, 401, 403):
+                directories.append(url.rstrip('/'))
+    return count, directories
 
-    # Larger scan
-    larger_wordlist = args.larger_wordlist
+class DirectoryJobs:
+    # Child scans of --managed-recursion, instead of ffuf's -recursion with the full wordlist.
+    # A directory found by any pass of any target is queued once per host and path (http and
+    # https of a host share it), then scanned with the wordlist of its depth. The scheduler
+    # takes jobs by depth, priority class of the target and how often the same directory name
+    # came up empty on other hosts, so framework folders repeated on every host sink to the
+    # back once they have proven empty. Static asset directories are not queued, and
+    # directories answering every path alike (wildcards) are dropped when their scan starts.
+    def __init__(self, wordlists, budget=None):
+        self.wordlists = wordlists
+        self.budget = budget
+        self.journal = None
+        self.lock = threading.Lock()
+        self.seen = set()
+        self.pending = []
+        self.empty_names = {}
+        self.sequence = 0
 
-    # Build the combined wordlist for the longer scan
-    combined_wordlist = []
+    def restore(self, journal):
+        # Jobs of a resumed run that were queued but not scanned are queued again
+        self.journal = journal
+        for url, job in journal.pending_directories():
+            self.add(url, job['target'], job['depth'], job['priority'], record=False)
 
-    scanned_paths = set()  # Reset scanned_paths for the longer scan
+    def job_key(self, url):
+        parsed_url = urlparse(url)
+        port = parsed_url.port if parsed_url.port not in (None, 80, 443) else ''
+        return f"{(parsed_url.hostname or '').lower()}:{port}{parsed_url.path}"
 
-    # First, add disallowed paths and additional keywords
-    for path in disallowed_paths:
-        path = path.strip().lower()
-        if path not in scanned_paths:
-            combined_wordlist.append(path)
-            scanned_paths.add(path)
-    for keyword in additional_keywords:
-        keyword = keyword.strip().lower()
-        if keyword not in scanned_paths:
-            combined_wordlist.append(keyword)
-            scanned_paths.add(keyword)
+    def add(self, url, target, depth, priority, record=True):
+        name = url.rsplit('/', 1)[-1].lower()
+        if name in STATIC_DIRECTORIES:
+            print(f"Not descending into {url}: static assets.")
+            return
+        with self.lock:
+            key = self.job_key(url)
+            if key in self.seen:
+                return
+            self.seen.add(key)
+            self.pending.append({'url': url, 'target': target, 'depth': depth, 'priority': priority, 'name': name,
+                                 'sequence': self.sequence})
+            self.sequence += 1
+        if record and self.journal:
+            self.journal.add_directory(url, {'target': target, 'depth': depth, 'priority': priority})
 
-    # Add user-provided priority words
-    for word in user_priority_words:
-        word = word.strip().lower()
-        if word not in scanned_paths:
-            combined_wordlist.append(word)
-            scanned_paths.add(word)
+    def queue_from_output(self, target, output_path, depth, priority):
+        # Queues the directories of a finished pass; depth is the depth of their child scans
+        count, directories = scan_output(output_path)
+        if depth <= len(self.wordlists):
+            for url in directories:
+                self.add(url, target, depth, priority)
+        return count
 
-    # Add words from the user-provided priority wordlist
-    if args.priority_wordlist:
-        try:
-            with open(args.priority_wordlist, 'r') as priority_wordlist_file:
-                for line in priority_wordlist_file:
-                    word = line.strip().lower()
-                    if word and word not in scanned_paths:
-                        combined_wordlist.append(word)
-                        scanned_paths.add(word)
-        except FileNotFoundError:
-            print(f"Priority wordlist file not found: {args.priority_wordlist}")
-            sys.exit(1)
+    def rank(self, job):
+        return (job['depth'], job['priority'], self.empty_names.get(job['name'], 0), job['sequence'])
 
-    # Read the larger wordlist and categorize the entries
-    words_starting_with_config = []
-    words_env = []
-    other_words = []
-    try:
-        with open(larger_wordlist, 'r') as original_wordlist:
-            for line in original_wordlist:
-                word = line.strip().lower()
-                if word:
-                    # Remove words that have extensions matching the specified ones
-                    if any(word.endswith(ext) for ext in extensions):
-                        continue
-                    if word.startswith('config'):
-                        words_starting_with_config.append(word)
-                    elif word in ['env', '.env']:
-                        words_env.append(word)
-                    else:
-                        other_words.append(word)
-    except FileNotFoundError:
-        print(f"Larger wordlist file not found: {larger_wordlist}")
-        sys.exit(1)
+    def waiting(self):
+        with self.lock:
+            return bool(self.pending) and not (self.budget and self.budget.exhausted())
 
-    # Remove duplicates while preserving order
-    words_starting_with_config = list(dict.fromkeys(words_starting_with_config))
-    words_env = list(dict.fromkeys(words_env))
-    other_words = list(dict.fromkeys(other_words))
-
-    # Randomize the order of the other words
-    random.shuffle(other_words)
-
-    # Combine all words in the specified order
-    for word in words_starting_with_config:
-        if word not in scanned_paths:
-            combined_wordlist.append(word)
-            scanned_paths.add(word)
-    for word in words_env:
-        if word not in scanned_paths:
-            combined_wordlist.append(word)
-            scanned_paths.add(word)
-    for word in other_words:
-        if word not in scanned_paths:
-            combined_wordlist.append(word)
-            scanned_paths.add(word)
+    def take(self, host_free):
+        # The best job whose host has a free slot, None when there is none
+        if self.budget and self.budget.exhausted():
+            return None
+        with self.lock:
+            for job in sorted(self.pending, key=self.rank):
+                if host_free(job['url']):
+                    self.pending.remove(job)
+                    return job
+        return None
 
-    # Create a temporary wordlist file and write the combined wordlist
-    with tempfile.NamedTemporaryFile(mode='w+', delete=False) as temp_wordlist:
-        for word in combined_wordlist:
-            temp_wordlist.write(f"{word}\n")
-    temp_wordlist_path = temp_wordlist.name
+    def finish(self, job, results):
+        # results is None for a directory that was not scanned
+        with self.lock:
+            if results == 0:
+                self.empty_names[job['name']] = self.empty_names.get(job['name'], 0) + 1
+        if self.journal:
+            self.journal.directory_done(job['url'])
 
-    # Generate new output filename for the longer scan
-    output_filename = f"{safe_domain}_{date_str}_larger.json"
+def scan_directory(job, args, ffuf_args, context, detach=False, calibrator=None):
+    # Child scan of one directory found by managed recursion
+    url = job['url']
+    directory_jobs = context.directory_jobs
+    if calibrator:
+        calibration = calibrator.calibrate(url, [])
+        responses = calibration['baselines'][0]['responses'] if calibration['baselines'] else []
+        if calibration['stable'] and all(response and 200 <= response['status'] < 300 for response in responses):
+            print(f"Skipping {url}: every path below it answers alike (wildcard directory).")
+            directory_jobs.finish(job, None)
+            return
+        if not calibration['stable']:
+            print(f"No stable baseline for {url}, using ffuf auto calibration.")
+        ffuf_args = calibrated_args(calibration, ffuf_args)
+    else:
+        ffuf_args = ffuf_args + ['-ac']
+    wordlist = directory_jobs.wordlists[job['depth'] - 1]
+    try:
+        with trace_span(context, 'wordlist_build', job['target'], profile=True, wordlist=wordlist):
+            compiled = compile_wordlist(wordlist, [], args.cache_dir, args.stream_build, args.bloom_fp_rate)
+    except FileNotFoundError:
+        print(f"Recursion wordlist file not found: {wordlist}")
+        sys.exit(1)
+    temp_wordlist_path = write_target_wordlist([], compiled, tmpfs_max=args.tmpfs_max * 1024 * 1024)
 
-    # Large scan ffuf command without additional extensions and with auto calibration
+    print(f"Scanning directory {url} (depth {job['depth']}, {compiled.words} words)")
+    date_str = datetime.datetime.now().strftime('%Y%m%d')
+    path_name = re.sub(r'[^A-Za-z0-9.-]+', '_', urlparse(url).path.strip('/'))
+    output_filename = f"{output_prefix(job['target'])}_{date_str}_dir_{path_name}.json"
     ffuf_command = [
         'ffuf',
         '-w', temp_wordlist_path,
-        '-u', url_with_fuzz,
+        '-u', f"{url}/FUZZ",
         '-c',
-        '-recursion',
-        '-recursion-depth', '1',
-        '-ac',  # Auto calibration
         '-o', output_filename,
         '-of', 'json',
         '-or'
-    ]
+    ] + ffuf_args
+    status = execute_pass(job['target'], args, ffuf_command, temp_wordlist_path, detach, pass_name='dir',
+                          threads=ffuf_threads(ffuf_args), context=context)
+    if status == 'interrupt':
+        print(f"\nDirectory scan interrupted for {url}.")
+        return 'interrupt'
+    if os.path.exists(output_filename):
+        print(f"Directory findings saved to {output_filename}")
+    results = directory_jobs.queue_from_output(job['target'], output_filename, job['depth'] + 1, job['priority'])
+    if status in ('partial', 'failed'):
+        # Left pending in the journal, a resumed run scans the directory again
+        print(f"Directory scan of {url} stopped before the end of the wordlist.")
+        return
+    directory_jobs.finish(job, results)
 
-    # Append any additional ffuf arguments provided by the user
-    ffuf_command.extend(ffuf_args)
+# ffuf filter options the quick pass applies itself, and the result field each one filters on
+QUICK_FILTER_FIELDS = {'-fc': 'status', '-fs': 'length', '-fw': 'words', '-fl': 'lines'}
 
-    # Execute the ffuf command
+def parse_number_list(value):
+    # "404,301-302" -> set of ints; other values (e.g. ffuf's 'all') are ignored
+    numbers = set()
+    for part in (value or '').split(','):
+        part = part.strip()
+        low, _, high = part.partition('-')
+        if low.isdigit() and (not high or high.isdigit()):
+            numbers.update(range(int(low), int(high or low) + 1))
+    return numbers
+
+def quick_filters(ffuf_args, calibration=None):
+    # Matched statuses and {field: values} filters for the quick pass, from the user's ffuf
+    # arguments and the calibration of the target, the way the ffuf passes would apply them
+    match_statuses = ffuf_match_statuses(ffuf_args)
+    filters = {field: parse_number_list(get_ffuf_option(ffuf_args, option)) for option, field in QUICK_FILTER_FIELDS.items()}
+    if calibration and calibration['stable']:
+        for option, values in calibration['filters'].items():
+            filters[QUICK_FILTER_FIELDS[option]].update(values)
+    return match_statuses, filters
+
+class QuickPass:
+    # A minimal HTTP/1.1 client on asyncio streams: one event loop sends the high-value
+    # words of every target over keep-alive connections pooled per host, with at most
+    # per_host requests in flight per host and `concurrency` in total. Responses are turned
+    # into ffuf result entries (length, words and lines counted the way ffuf counts them).
+    # A host that refuses max_connect_failures connections in a row gets no more requests.
+    user_agent = 'Fuzz Faster U Fool v2.1.0'
+    max_connect_failures = 3
+
+    def __init__(self, concurrency=200, per_host=4, timeout=10, max_body=2 * 1024 * 1024, headers=()):
+        self.concurrency = concurrency
+        self.per_host = per_host
+        self.timeout = timeout
+        self.max_body = max_body
+        self.ssl_context = ssl.create_default_context()
+        self.ssl_context.check_hostname = False
+        self.ssl_context.verify_mode = ssl.CERT_NONE
+        self.pools = {}
+        self.host_limits = {}
+        # Connect failures in a row per (host, port), and the hosts given up on
+        self.connect_failures = {}
+        self.dead_hosts = set()
+        # The user's -H headers, as the ffuf passes send them
+        self.headers = ''.join(f"{header}\r\n" for header in headers)
+        if not any(header.lower().startswith('user-agent:') for header in headers):
+            self.headers += f"User-Agent: {self.user_agent}\r\n"
+
+    async def connect(self, scheme, host, port):
+        if scheme == 'https':
+            return await asyncio.open_connection(host, port, ssl=self.ssl_context, server_hostname=host)
+        return await asyncio.open_connection(host, port)
+
+    async def read_response(self, reader):
+        # (status, headers, body, keep_alive)
+        status_line = await reader.readline()
+        if not status_line:
+            raise ConnectionError('Connection closed by the server')
+        version, status, _ = (status_line.decode('latin-1').rstrip('\r\n') + '  ').split(' ', 2)
+        status = int(status)
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+        connection = headers.get('connection', '').lower()
+        keep_alive = connection == 'keep-alive' if version == 'HTTP/1.0' else connection != 'close'
+        if status in (204, 304) or 100 <= status < 200:
+            body = b''
+        elif 'chunked' in headers.get('transfer-encoding', '').lower():
+            chunks = bytearray()
+            while True:
+                size = int(((await reader.readline()).split(b';')[0].strip() or b'0'), 16)
+                if not size:
+                    # Trailers end with an empty line
+                    while (await reader.readline()) not in (b'\r\n', b'\n', b''):
+                        pass
+                    break
+                chunks += (await reader.readexactly(size + 2))[:-2]
+                if len(chunks) > self.max_body:
+                    keep_alive = False
+                    break
+            body = bytes(chunks)
+        elif 'content-length' in headers:
+            length = int(headers['content-length'])
+            if length > self.max_body:
+                # The rest is left unread, the connection is not reused
+                length = self.max_body
+                keep_alive = False
+            body = await reader.readexactly(length)
+        else:
+            body = await reader.read(self.max_body)
+            keep_alive = False
+        return status, headers, body, keep_alive
+
+    async def fetch(self, scheme, host, port, path):
+        key = (scheme, host, port)
+        pool = self.pools.setdefault(key, [])
+        host_header = host if port == (443 if scheme == 'https' else 80) else f"{host}:{port}"
+        request = (f"GET {path} HTTP/1.1\r\nHost: {host_header}\r\n{self.headers}"
+                   f"Accept: */*\r\nConnection: keep-alive\r\n\r\n").encode('latin-1', 'replace')
+        for attempt in range(2):
+            reused = bool(pool)
+            if reused:
+                reader, writer = pool.pop()
+            else:
+                try:
+                    reader, writer = await asyncio.wait_for(self.connect(scheme, host, port), self.timeout)
+                except (OSError, asyncio.TimeoutError):
+                    failures = self.connect_failures.get((host, port), 0) + 1
+                    self.connect_failures[(host, port)] = failures
+                    if failures >= self.max_connect_failures and (host, port) not in self.dead_hosts:
+                        self.dead_hosts.add((host, port))
+                        print(f"Quick pass: {failures} connections to {host}:{port} failed in a row, skipping its remaining paths.")
+                    raise
+                self.connect_failures[(host, port)] = 0
+            try:
+                writer.write(request)
+                await asyncio.wait_for(writer.drain(), self.timeout)
+                status, headers, body, keep_alive = await asyncio.wait_for(self.read_response(reader), self.timeout)
+            except (OSError, ConnectionError, ValueError, asyncio.IncompleteReadError, asyncio.TimeoutError):
+                writer.close()
+                if reused and not attempt:
+                    # The server closed an idle keep-alive connection, try a new one
+                    continue
+                raise
+            if keep_alive:
+                pool.append((reader, writer))
+            else:
+                writer.close()
+            return status, headers, body
+
+    async def request(self, url, word, position, limit):
+        parsed_url = urlparse(url)
+        scheme = parsed_url.scheme
+        port = parsed_url.port or (443 if scheme == 'https' else 80)
+        key = (parsed_url.hostname, port)
+        if key not in self.host_limits:
+            self.host_limits[key] = asyncio.Semaphore(self.per_host)
+        path = quote(f"{parsed_url.path.rstrip('/')}/{word}", safe="/%?=&:@!$'()*+,;~")
+        # The host's own limit first, so requests waiting for a busy host do not hold global slots
+        async with self.host_limits[key], limit:
+            if stop_event.is_set():
+                return None
+            if key in self.dead_hosts:
+                raise ConnectionError(f"{parsed_url.hostname}:{port} is not reachable")
+            started = time.monotonic()
+            status, headers, body = await self.fetch(scheme, parsed_url.hostname, port, path)
+        return {
+            'input': {'FUZZ': word},
+            'position': position,
+            'status': status,
+            'length': len(body),
+            'words': body.count(b' ') + 1,
+            'lines': body.count(b'\n') + 1,
+            'content-type': headers.get('content-type', ''),
+            'redirectlocation': headers.get('location', ''),
+            'url': f"{url}/{word}",
+            'duration': int((time.monotonic() - started) * 1e9),
+            'resultfile': '',
+            'host': parsed_url.netloc,
+        }
+
+    async def scan(self, jobs, on_response):
+        # jobs: list of (url, words); on_response(url, result or exception) for every request
+        limit = asyncio.Semaphore(self.concurrency)
+
+        async def run(url, word, position):
+            try:
+                result = await self.request(url, word, position, limit)
+            except (OSError, ConnectionError, ValueError, asyncio.IncompleteReadError, asyncio.TimeoutError) as e:
+                result = e
+            if result is not None:
+                on_response(url, result)
+
+        # Words are interleaved across targets, so every host gets its first words early
+        tasks = []
+        for position, batch in enumerate(itertools.zip_longest(*[words for url, words in jobs]), 1):
+            for (url, words), word in zip(jobs, batch):
+                if word is not None:
+                    tasks.append(asyncio.ensure_future(run(url, word, position)))
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for pool in self.pools.values():
+                for reader, writer in pool:
+                    writer.close()
+            self.pools.clear()
+
+def run_quick_pass(targets, args, ffuf_args, calibrator=None, context=None):
+    # Sends the robots/sitemap paths, domain keywords and priority words of every target
+    # (url, robots_paths) in one event loop before the ffuf scans start, and writes the
+    # findings per target as {domain}_{date}_quick.json in ffuf's JSON layout
+    if not targets:
+        return
+    jobs = []
+    for url, robots_paths in targets:
+        url = url.strip().rstrip('/')
+        domain = urlparse(url).netloc or url
+        jobs.append((url, build_prefix_words(robots_paths or [], domain_keywords(domain), USER_PRIORITY_WORDS, args.priority_wordlist)))
+    # The calibrations are cached, so the ffuf passes reuse them
+    calibrations = {}
+    if calibrator:
+        with ThreadPoolExecutor(max_workers=args.robots_workers) as executor:
+            calibrations = dict(zip([url for url, words in jobs],
+                                    executor.map(lambda job: calibrator.calibrate(job[0], SCAN_EXTENSIONS), jobs)))
+    state = {}
+    for url, words in jobs:
+        match_statuses, filters = quick_filters(ffuf_args, calibrations.get(url))
+        state[url] = {'metrics': start_metrics(url, 'quick'), 'match': match_statuses, 'filters': filters, 'results': []}
+        state[url]['metrics'].progress.update(position=0, total=len(words), errors=0)
+
+    def on_response(url, result):
+        target = state[url]
+        progress = target['metrics'].progress
+        progress['position'] += 1
+        if isinstance(result, Exception):
+            progress['errors'] += 1
+            return
+        if result['status'] not in target['match']:
+            return
+        if any(result[field] in values for field, values in target['filters'].items()):
+            return
+        target['results'].append(result)
+        target['metrics'].add_result(result)
+        print_result(result)
+
+    total = sum(len(words) for url, words in jobs)
+    print(f"Quick pass: {total} high-value paths on {len(jobs)} targets.")
+    engine = QuickPass(args.quick_concurrency, args.quick_per_host, headers=ffuf_headers(ffuf_args))
+    with trace_span(context, 'quick_pass', targets=len(jobs), requests=total) as span:
+        asyncio.run(engine.scan(jobs, on_response))
+        span['results'] = sum(len(target['results']) for target in state.values())
+    date_str = datetime.datetime.now().strftime('%Y%m%d')
+    for url, target in state.items():
+        target['metrics'].finish('interrupted' if stop_event.is_set() else 'done')
+        if not target['results']:
+            continue
+        output_filename = f"{output_prefix(url)}_{date_str}_quick.json"
+        with open(output_filename, 'w') as output_file:
+            json.dump({
+                'commandline': f"wr.py quick pass {url}",
+                'time': datetime.datetime.now().astimezone().isoformat(timespec='seconds'),
+                'results': target['results'],
+                'config': {},
+            }, output_file)
+        print(f"Quick pass findings saved to {output_filename}")
+    if args.metrics_file:
+        write_metrics_file(args.metrics_file)
+
+def quick_pass_then_scan(scheduler, args, ffuf_args, calibrator=None):
+    # Holds the scheduler until every target is queued and the quick pass over all of them is done
+    with scheduler.cond:
+        while not scheduler.closed and scheduler.exit_code is None:
+            scheduler.cond.wait(0.5)
+        targets = [(url, robots_paths) for priority, sequence, url, robots_paths in scheduler.pending]
     try:
-        subprocess.run(ffuf_command)
-    except KeyboardInterrupt:
-        print("\nLonger scan interrupted.")
-        return 'interrupt'
+        if scheduler.exit_code is None:
+            run_quick_pass(targets, args, ffuf_args, calibrator, scheduler.context)
+            if scheduler.journal:
+                scheduler.journal.set_quick_pass_done()
     finally:
-        os.remove(temp_wordlist_path)
+        with scheduler.cond:
+            scheduler.paused = False
+            scheduler.cond.notify_all()
 
-    if os.path.exists(output_filename):
-        print(f"Longer scan findings saved to {output_filename}")
+QUEUE_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS targets (
+    url TEXT PRIMARY KEY,
+    priority INTEGER NOT NULL,
+    sequence INTEGER NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    worker TEXT,
+    lease TEXT,
+    leased REAL,
+    lease_expires REAL,
+    attempts INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS targets_claim ON targets(status, priority, sequence);
+CREATE TABLE IF NOT EXISTS completions (
+    url TEXT PRIMARY KEY,
+    worker TEXT NOT NULL,
+    lease TEXT NOT NULL,
+    completed REAL NOT NULL,
+    outputs TEXT NOT NULL
+);
+'''
+
+class WorkQueue:
+    # Targets of one list shared by any number of `wr.py --worker` processes, on one machine or
+    # on several sharing a filesystem. A worker leases a target and keeps the lease alive with
+    # heartbeats; leases of a crashed worker expire and the target is handed out again (up to
+    # max_attempts times). Only the current lease holder can complete a target, and the
+    # completions table holds at most one record per target.
+    def __init__(self, path, lease_ttl=120, max_attempts=3):
+        self.path = path
+        self.lease_ttl = lease_ttl
+        self.max_attempts = max_attempts
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        # The rollback journal rather than WAL, which needs shared memory that network filesystems lack
+        self.connection = sqlite3.connect(path, timeout=60, isolation_level=None, check_same_thread=False)
+        self.connection.executescript(QUEUE_SCHEMA)
+        self.lock = threading.Lock()
+        self.leases = {}
+        self.stopped = threading.Event()
+        self.heartbeat_thread = None
+
+    def transaction(self, statements):
+        # Runs statements(cursor) in one write transaction and returns its result
+        with self.lock:
+            cursor = self.connection.cursor()
+            cursor.execute('BEGIN IMMEDIATE')
+            try:
+                result = statements(cursor)
+            except BaseException:
+                cursor.execute('ROLLBACK')
+                raise
+            cursor.execute('COMMIT')
+            return result
+
+    def add(self, targets):
+        # targets is a list of (priority, url); targets already in the queue are left as they are
+        def insert(cursor):
+            sequence = cursor.execute('SELECT COALESCE(MAX(sequence), -1) + 1 FROM targets').fetchone()[0]
+            added = 0
+            for priority, url in targets:
+                cursor.execute('INSERT OR IGNORE INTO targets (url, priority, sequence) VALUES (?, ?, ?)',
+                               (url.strip().rstrip('/'), priority, sequence))
+                added += cursor.rowcount
+                sequence += 1
+            return added
+        return self.transaction(insert)
+
+    def claim(self):
+        # Leases the next pending, interrupted or expired target; returns (url, priority) or None
+        def lease_next(cursor):
+            now = time.time()
+            # Targets whose last lease expired too often are given up
+            cursor.execute("UPDATE targets SET status = 'failed', lease = NULL WHERE status = 'leased' "
+                           "AND lease_expires < ? AND attempts >= ?", (now, self.max_attempts))
+            # A target interrupted here was skipped at the prompt, it is left to other workers and later runs
+            row = cursor.execute("SELECT url, priority FROM targets WHERE status = 'pending' "
+                                 "OR (status = 'interrupted' AND worker != ?) "
+                                 "OR (status = 'leased' AND lease_expires < ?) ORDER BY priority, sequence LIMIT 1",
+                                 (self.worker_id, now)).fetchone()
+            if not row:
+                return None
+            lease = uuid.uuid4().hex
+            cursor.execute("UPDATE targets SET status = 'leased', worker = ?, lease = ?, leased = ?, lease_expires = ?, "
+                           "attempts = attempts + 1 WHERE url = ?",
+                           (self.worker_id, lease, now, now + self.lease_ttl, row[0]))
+            self.leases[row[0]] = (lease, now)
+            return row
+        return self.transaction(lease_next)
+
+    def heartbeat(self):
+        while not self.stopped.wait(self.lease_ttl / 3):
+            for url, (lease, leased) in list(self.leases.items()):
+                renewed = self.transaction(lambda cursor: cursor.execute(
+                    "UPDATE targets SET lease_expires = ? WHERE url = ? AND lease = ?",
+                    (time.time() + self.lease_ttl, url, lease)).rowcount)
+                if not renewed:
+                    print(f"Lease on {url} was lost, its results will not be recorded by this worker.")
+                    self.leases.pop(url, None)
+
+    def start(self):
+        self.heartbeat_thread = threading.Thread(target=self.heartbeat, daemon=True)
+        self.heartbeat_thread.start()
+
+    def finish(self, url, result):
+        # Scheduler callback: records the completion, or marks an interrupted target
+        lease, leased = self.leases.pop(url, (None, None))
+        if lease is None:
+            return
+        if result == 'interrupt':
+            # Claimable again; like a lease handed back on exit, the interruption is not a failed attempt
+            self.transaction(lambda cursor: cursor.execute(
+                "UPDATE targets SET status = 'interrupted', lease = NULL, attempts = attempts - 1 "
+                "WHERE url = ? AND lease = ?", (url, lease)))
+            return
+        if result in ('error', 'skipped'):
+            # Another worker may be able to scan it (e.g. a wordlist missing on this machine, or budget left),
+            # a target that keeps failing is given up like one whose leases keep expiring
+            self.transaction(lambda cursor: cursor.execute(
+                "UPDATE targets SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, lease = NULL "
+                "WHERE url = ? AND lease = ?", (self.max_attempts, url, lease)))
+            return
+        prefix = output_prefix(url)
+        outputs = sorted(path for path in output_files(prefix) if os.path.getmtime(path) >= leased)
+
+        def complete(cursor):
+            updated = cursor.execute("UPDATE targets SET status = 'done', lease = NULL WHERE url = ? AND lease = ? "
+                                     "AND status = 'leased'", (url, lease)).rowcount
+            if updated:
+                cursor.execute('INSERT INTO completions (url, worker, lease, completed, outputs) VALUES (?, ?, ?, ?, ?)',
+                               (url, self.worker_id, lease, time.time(), json.dumps(outputs)))
+            return updated
+        if not self.transaction(complete):
+            print(f"{url} was handed to another worker meanwhile, its completion is not recorded twice.")
+
+    def counts(self):
+        with self.lock:
+            return dict(self.connection.execute('SELECT status, COUNT(*) FROM targets GROUP BY status').fetchall())
+
+    def drained(self):
+        # Nothing left to claim now or later: no pending targets, no targets interrupted in other
+        # workers and no live leases elsewhere
+        with self.lock:
+            return not self.connection.execute("SELECT COUNT(*) FROM targets WHERE status IN ('pending', 'leased') "
+                                               "OR (status = 'interrupted' AND worker != ?)", (self.worker_id,)).fetchone()[0]
+
+    def close(self):
+        self.stopped.set()
+        if self.heartbeat_thread:
+            self.heartbeat_thread.join()
+        # Leases still held (the worker is exiting) are handed back right away
+        for url, (lease, leased) in list(self.leases.items()):
+            self.transaction(lambda cursor: cursor.execute(
+                "UPDATE targets SET status = 'pending', lease = NULL, attempts = attempts - 1 "
+                "WHERE url = ? AND lease = ?", (url, lease)))
+        self.connection.close()
+
+def feed_from_queue(queue, scheduler, harvester, poll_interval=5):
+    # Claims targets while the scheduler has free slots, until the queue is drained
+    try:
+        while True:
+            if scheduler.context.budget and scheduler.context.budget.exhausted():
+                print("Budget used up, this worker takes no more targets.")
+                break
+            if not stop_event.is_set() and scheduler.free_slots() > 0:
+                claimed = queue.claim()
+                if claimed:
+                    url, priority = claimed
+                    scheduler.add(url, priority, harvester.fetch(url))
+                    continue
+                if queue.drained():
+                    break
+            time.sleep(poll_interval if scheduler.free_slots() > 0 else 0.5)
+    finally:
+        scheduler.close()
+
+def enqueue_list(urls, queue, context=None):
+    # Resolves targets without scheme with httpx (the same categories as a list run) and queues them
+    if all(url.startswith('http://') or url.startswith('https://') for url in urls):
+        targets = [(1, url) for url in urls]
+    else:
+        print("Using httpx to resolve URLs without scheme and detect technologies...")
+        temp_urls_file = tempfile.NamedTemporaryFile(mode='w+', delete=False)
+        for url in urls:
+            temp_urls_file.write(f"{url}\n")
+        temp_urls_file.close()
+        with trace_span(context, 'probe'):
+            output = subprocess.run(['httpx', '-td', '-silent', '-nc', '-l', temp_urls_file.name],
+                                    stdout=subprocess.PIPE, stdin=subprocess.DEVNULL, text=True).stdout
+        os.remove(temp_urls_file.name)
+        targets = []
+        unprocessed_urls = []
+        for line in output.splitlines():
+            if not line.strip():
+                continue
+            url_part, category = categorize_httpx_line(line.strip())
+            if category == 'excluded':
+                unprocessed_urls.append(url_part)
+            else:
+                targets.append((0 if category == 'priority' else 1, url_part))
+        if unprocessed_urls:
+            with open('unprocessed.txt', 'w') as f:
+                for url in unprocessed_urls:
+                    f.write(f"{url}\n")
+            print(f"Excluded URLs saved to unprocessed.txt")
+    return queue.add(targets)
+
+class Scheduler:
+    # Runs process_url for several targets at once, bounded by a global and a per-host cap.
+    # Targets are picked by (priority, arrival order), so priority hosts always start first.
+    def __init__(self, args, ffuf_args, add_se, journal=None, calibrator=None, on_finish=None, context=None):
+        self.args = args
+        self.ffuf_args = ffuf_args
+        self.add_se = add_se
+        self.journal = journal
+        self.calibrator = calibrator
+        self.context = context or RunContext()
+        # on_finish(url, result) runs after each target, result is 'interrupt', 'error' or None
+        self.on_finish = on_finish
+        self.parallel = max(1, args.parallel)
+        self.per_host = max(1, args.per_host)
+        self.detach = self.parallel > 1
+        self.cond = threading.Condition()
+        self.pending = []
+        self.running = {}
+        self.host_counts = {}
+        self.sequence = 0
+        self.closed = False
+        self.exit_code = None
+        # Set while the quick pass runs, no target is started
+        self.paused = False
+
+    def add(self, url, priority=1, robots_paths=None):
+        if self.journal:
+            # Targets finished in an earlier run of a resumed journal are not scanned again
+            if self.journal.is_done(url):
+                return
+            self.journal.add_target(url, priority)
+        with self.cond:
+            bisect.insort(self.pending, (priority, self.sequence, url, robots_paths))
+            self.sequence += 1
+            self.cond.notify_all()
+
+    def close(self):
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
+
+    def free_slots(self):
+        with self.cond:
+            return self.parallel - len(self.running) - len(self.pending)
+
+    def host_key(self, url):
+        parsed_url = urlparse(url)
+        return (parsed_url.hostname or parsed_url.path).lower()
+
+    def start_ready(self):
+        # Called with self.cond held
+        if self.paused:
+            return
+        index = 0
+        while index < len(self.pending) and len(self.running) < self.parallel:
+            priority, sequence, url, robots_paths = self.pending[index]
+            host = self.host_key(url)
+            if self.host_counts.get(host, 0) >= self.per_host:
+                index += 1
+                continue
+            del self.pending[index]
+            self.host_counts[host] = self.host_counts.get(host, 0) + 1
+            thread = threading.Thread(target=self.worker, args=(url, host, robots_paths, priority), daemon=True)
+            self.running[thread] = url
+            thread.start()
+        # Directory jobs of --managed-recursion take the slots no waiting target can use
+        directory_jobs = self.context.directory_jobs
+        while directory_jobs and len(self.running) < self.parallel:
+            job = directory_jobs.take(lambda url: self.host_counts.get(self.host_key(url), 0) < self.per_host)
+            if not job:
+                break
+            host = self.host_key(job['url'])
+            self.host_counts[host] = self.host_counts.get(host, 0) + 1
+            thread = threading.Thread(target=self.directory_worker, args=(job, host), daemon=True)
+            self.running[thread] = job['url']
+            thread.start()
+
+    def worker(self, url, host, robots_paths, priority=1):
+        result = 'error'
+        try:
+            if self.detach:
+                print(f"Starting scan for {url}")
+            result = process_url(url, self.args, self.ffuf_args, self.add_se, self.detach, robots_paths, self.journal,
+                                 self.calibrator, priority, self.context)
+            if self.detach and result != 'interrupt':
+                print(f"Finished scan for {url}")
+        except SystemExit as e:
+            self.fatal(e.code)
+        finally:
+            if self.context.budget:
+                self.context.budget.finish(url)
+            if self.on_finish:
+                self.on_finish(url, result)
+            self.release(host)
+
+    def directory_worker(self, job, host):
+        try:
+            scan_directory(job, self.args, self.ffuf_args, self.context, self.detach, self.calibrator)
+        except SystemExit as e:
+            self.fatal(e.code)
+        finally:
+            self.release(host)
+
+    def fatal(self, code):
+        # A fatal error in one target (e.g. missing wordlist) stops the whole run
+        with self.cond:
+            self.exit_code = code
+        stop_event.set()
+        stop_all_processes()
+
+    def release(self, host):
+        with self.cond:
+            del self.running[threading.current_thread()]
+            self.host_counts[host] -= 1
+            if not self.host_counts[host]:
+                del self.host_counts[host]
+            self.cond.notify_all()
+
+    def wait_running(self):
+        with self.cond:
+            while self.running:
+                self.cond.wait(0.5)
+
+    def interrupt(self):
+        stop_event.set()
+        stop_all_processes()
+        self.wait_running()
+        if self.exit_code is not None:
+            return
+        print("Do you want to continue with the next URL? (y/n): ", end='', flush=True)
+        try:
+            choice = sys.stdin.readline().strip().lower()
+        except (KeyboardInterrupt, EOFError):
+            # A second Ctrl-C at the prompt quits
+            print()
+            choice = 'n'
+        if choice != 'y':
+            sys.exit(0)
+        stop_event.clear()
+
+    def run(self):
+        while True:
+            try:
+                with self.cond:
+                    if self.exit_code is None:
+                        self.start_ready()
+                    if self.exit_code is not None and not self.running:
+                        break
+                    if self.closed and not self.pending and not self.running and not (self.context.directory_jobs and self.context.directory_jobs.waiting()):
+                        break
+                    self.cond.wait(0.5)
+            except KeyboardInterrupt:
+                self.interrupt()
+        if self.exit_code is not None:
+            sys.exit(self.exit_code)
+
+def split_httpx_line(line):
+    # Expected format: URL [Title] [Technologies]
+    parts = line.split('[')
+    url_part = parts[0].strip()
+    technologies = ''
+    if len(parts) > 2:
+        technologies = '[' + '['.join(parts[2:])  # Reconstruct technologies part
+    elif len(parts) > 1:
+        technologies = '[' + parts[1]  # Include the '[' back
+    technologies = technologies.replace(']', '').strip()
+    return url_part, technologies
+
+def categorize_httpx_line(line):
+    url_part, technologies = split_httpx_line(line)
+    technologies_lower = technologies.lower()
+    # Check for exclusion technologies
+    exclusion_techs = ['vpn', 'checkpoint', 'imperva', 'cloudflare', 'cisco']
+    if any(tech in technologies_lower for tech in exclusion_techs):
+        return url_part, 'excluded'
+    # Check for priority technologies
+    priority_techs = ['php', 'tomcat', 'iis:8.5']
+    if any(tech in technologies_lower for tech in priority_techs):
+        return url_part, 'priority'
+    return url_part, 'other'
+
+def queue_target(url, priority, scheduler, harvester, deduplicator=None):
+    # The target reaches the scheduler once its robots.txt/sitemap.xml paths are harvested,
+    # unless it is a duplicate of a backend that is already queued
+    def add(paths):
+        if deduplicator and not deduplicator.admit(url):
+            return
+        scheduler.add(url, priority, paths)
+    return harvester.submit(url, add)
+
+def queue_targets(targets, scheduler, harvester, deduplicator=None):
+    # targets is a list of (priority, url)
+    futures = [queue_target(url, priority, scheduler, harvester, deduplicator) for priority, url in targets]
+    wait(futures)
+    if scheduler.journal:
+        scheduler.journal.set_probe_done()
+    scheduler.close()
+
+def read_probe_output(process, temp_urls_path, scheduler, harvester, deduplicator=None):
+    # Categorize each host as soon as httpx prints it and feed it straight to the scheduler
+    unprocessed_urls = []
+    futures = []
+    try:
+        with trace_span(scheduler.context, 'probe', live=0, excluded=0) as span:
+            for line in process.stdout:
+                line = line.strip()
+                if not line:
+                    continue
+                url_part, category = categorize_httpx_line(line)
+                scheduler.context.target_technologies[url_part.rstrip('/')] = split_httpx_line(line)[1].lower()
+                if category == 'excluded':
+                    unprocessed_urls.append(url_part)
+                elif category == 'priority':
+                    futures.append(queue_target(url_part, 0, scheduler, harvester, deduplicator))
+                else:
+                    futures.append(queue_target(url_part, 1, scheduler, harvester, deduplicator))
+            process.wait()
+            span.update(live=len(futures), excluded=len(unprocessed_urls))
+        wait(futures)
+        if scheduler.journal:
+            scheduler.journal.set_probe_done()
+    finally:
+        os.remove(temp_urls_path)
+        # Write the excluded URLs to a file
+        if unprocessed_urls:
+            with open('unprocessed.txt', 'w') as f:
+                for url in unprocessed_urls:
+                    f.write(f"{url}\n")
+            print(f"Excluded URLs saved to unprocessed.txt")
+        scheduler.close()
+
+def start_probe(urls, scheduler, harvester, deduplicator=None):
+    temp_urls_file = tempfile.NamedTemporaryFile(mode='w+', delete=False)
+    # Write randomized URLs to a temporary file
+    for url in urls:
+        temp_urls_file.write(f"{url}\n")
+    temp_urls_file.close()
+    # Run httpx with -td to detect technologies, reading its results as they are printed.
+    # It gets its own session so Ctrl-C during a scan does not kill the probe.
+    process = subprocess.Popen(['httpx', '-td', '-silent', '-nc', '-l', temp_urls_file.name],
+                               stdout=subprocess.PIPE, stdin=subprocess.DEVNULL, text=True,
+                               start_new_session=True)
+    thread = threading.Thread(target=read_probe_output, args=(process, temp_urls_file.name, scheduler, harvester, deduplicator),
+                              daemon=True)
+    thread.start()
+    return process
 
 def main():
     parser = argparse.ArgumentParser(description='Wrapper script for ffuf.')
     group = parser.add_mutually_exclusive_group(required=True)
     group.add_argument('-u', '--url', help='The base URL to fuzz.')
     group.add_argument('-l', '--list', help='File containing URLs to fuzz.')
+    group.add_argument('--resume', metavar='JOURNAL', help='Resume an interrupted or crashed list run from its journal')
+    group.add_argument('--worker', metavar='QUEUE', help='Scan targets from a shared work queue (see --enqueue) until it is drained')
     parser.add_argument('-w', '--wordlist', default='/root/tools/dirsearch/db/dicc.txt',
                         help='Path to the small wordlist (default: /root/tools/dirsearch/db/dicc.txt)')
     parser.add_argument('-W', '--larger-wordlist', default='/usr/share/seclists/Discovery/Web-Content/raft-medium-words-lowercase.txt',
                         help='Path to the larger wordlist (default: /usr/share/seclists/Discovery/Web-Content/raft-medium-words-lowercase.txt)')
     parser.add_argument('--priority-wordlist', help='Path to a small priority wordlist to be used before the normal wordlist')
     parser.add_argument('--long-test', action='store_true', help='Perform both the short and longer scans')
+    parser.add_argument('--parallel', type=int, default=1,
+                        help='Number of targets to scan at once in list mode (default: 1)')
+    parser.add_argument('--per-host', type=int, default=1,
+                        help='Maximum concurrent scans against the same host in list mode (default: 1)')
+    parser.add_argument('--cache-dir', default=os.path.join(os.path.expanduser('~'), '.cache', 'wr'),
+                        help='Directory for cached per-host data (default: ~/.cache/wr)')
+    parser.add_argument('--robots-ttl', type=int, default=86400,
+                        help='Seconds before cached robots.txt/sitemap.xml results are revalidated (default: 86400)')
+    parser.add_argument('--robots-workers', type=int, default=20,
+                        help='Concurrent robots.txt/sitemap.xml fetches in list mode (default: 20)')
+    parser.add_argument('--calibration-ttl', type=int, default=86400,
+                        help='Seconds before a host\'s cached soft-404/wildcard baseline is measured again (default: 86400)')
+    parser.add_argument('--no-calibrate', action='store_true',
+                        help='Skip the baseline calibration: no filters on the short scan, ffuf -ac on the longer scan')
+    parser.add_argument('--no-dedup', action='store_true',
+                        help='Scan every target of a list, also those serving exactly the same backend as another one')
+    parser.add_argument('--clusters', help='Where to write the duplicate backend groups of a list run, rebuilt every run (default: <list file name>.clusters.json)')
+    parser.add_argument('--tested-store', action='store_true',
+                        help='Remember per target which requests completed, so later runs only send words that are new in the wordlists')
+    parser.add_argument('--stream-build', type=int, metavar='MB',
+                        help='Compile wordlists in streaming mode, keeping memory use around MB megabytes (for multi-million line lists)')
+    parser.add_argument('--tmpfs-max', type=int, default=TMPFS_MAX_MB, metavar='MB',
+                        help='Write per-target wordlist copies up to this size to /dev/shm (RAM) when available, larger ones '
+                             f'to the temp dir; 0 never uses tmpfs (default: {TMPFS_MAX_MB})')
+    parser.add_argument('--bloom-fp-rate', type=float, default=1e-6,
+                        help='False positive rate of the Bloom filter deduplicating config* words in streaming mode (default: 1e-6)')
+    parser.add_argument('--live', action='store_true',
+                        help='Read ffuf results as they arrive (-json) and print them right away (always on with --parallel > 1)')
+    parser.add_argument('--metrics-file',
+                        help='Keep per-target metrics in this file, JSON or Prometheus textfile format if it ends in .prom')
+    parser.add_argument('--adaptive', action='store_true',
+                        help='Adapt ffuf threads/rate per target to observed errors, timeouts, 429s and latency, remembering what worked per host')
+    parser.add_argument('--adaptive-max-threads', type=int, default=100,
+                        help='Upper bound for threads when ramping up in adaptive mode (default: 100)')
+    parser.add_argument('--adaptive-cooldown', type=float, default=10,
+                        help='Seconds to pause a struggling target before restarting it with lower settings (default: 10)')
+    parser.add_argument('--learned-order', action='store_true',
+                        help='Try the words that produced findings on the most earlier targets first, the rest stays shuffled')
+    parser.add_argument('--learn-from', metavar='GLOB', action='append',
+                        help='Add past ffuf JSON outputs to the hit statistics (repeatable, files already learned are skipped)')
+    parser.add_argument('--learned-head', type=int, default=500,
+                        help='Number of high-yield words put first with --learned-order (default: 500)')
+    parser.add_argument('--learned-groups', default='php,tomcat,iis',
+                        help='httpx technologies that get their own hit statistics (default: php,tomcat,iis)')
+    parser.add_argument('--budget-time', type=parse_duration, metavar='DURATION',
+                        help='Wall-clock budget of the run, e.g. 8h or 90m, split over the targets by priority and yield (default: no limit)')
+    parser.add_argument('--budget-requests', type=int, metavar='N',
+                        help='Total number of requests the run may send, split over the targets by priority and yield (default: no limit)')
+    parser.add_argument('--managed-recursion', action='store_true',
+                        help='Instead of ffuf -recursion with the full wordlist, queue child scans of found directories with smaller per-depth wordlists, skipping static asset and wildcard directories')
+    parser.add_argument('--recursion-wordlists',
+                        default='/usr/share/seclists/Discovery/Web-Content/raft-small-words-lowercase.txt,/usr/share/seclists/Discovery/Web-Content/common.txt',
+                        help='Comma-separated wordlists for directories at depth 1, 2, ...; their number is the recursion depth (default: raft-small-words-lowercase.txt,common.txt from seclists)')
+    parser.add_argument('--prune-extensions', action='store_true',
+                        help='Send only the extensions a target can handle (httpx technologies, 404 probes) and drop those indistinguishable from the baseline during the scan')
+    parser.add_argument('--extension-log', default='extension_decisions.jsonl',
+                        help='Where --prune-extensions logs every keep/drop decision as JSON lines (default: extension_decisions.jsonl)')
+    parser.add_argument('--quick-pass', action='store_true',
+                        help='Before any ffuf scan, send the robots/sitemap paths, domain keywords and priority words of every target from one asyncio event loop; findings go to <domain>_<date>_quick.json')
+    parser.add_argument('--quick-concurrency', type=int, default=200,
+                        help='Requests in flight at once during the quick pass (default: 200)')
+    parser.add_argument('--quick-per-host', type=int, default=4,
+                        help='Requests in flight per host during the quick pass, over pooled keep-alive connections (default: 4)')
+    parser.add_argument('--trace', metavar='PATH',
+                        help='Record a timed span for every phase of every target: Chrome trace events (chrome://tracing, Perfetto), or a JSON lines timeline for a .jsonl path')
+    parser.add_argument('--profile', metavar='PATH',
+                        help='Sample the Python stacks of the Python-side phases and save them as collapsed stacks (flamegraph.pl, speedscope)')
+    parser.add_argument('--enqueue', metavar='QUEUE',
+                        help='With -l, put the targets into a shared SQLite work queue for `--worker QUEUE` processes instead of scanning them')
+    parser.add_argument('--lease-ttl', type=int, default=120,
+                        help='Seconds a worker\'s lease on a target lasts without a heartbeat before it is handed out again (default: 120)')
+    parser.add_argument('--journal',
+                        help='Where to write the run journal in list mode (default: <list file name>.journal.jsonl in the current directory)')
     # Capture any additional arguments to pass to ffuf
     args, ffuf_args = parser.parse_known_args()
 
+    journal = None
+    if args.resume:
+        journal = load_journal(args.resume)
+        # Continue with the arguments of the original run; tracing and profiling are per invocation
+        trace_path, profile_path = args.trace, args.profile
+        args, ffuf_args = parser.parse_known_args(journal.data['argv'])
+        args.trace, args.profile = trace_path, profile_path
+
+    context = RunContext()
+    if args.prune_extensions:
+        context.extension_log = ExtensionLog(args.extension_log)
+    if args.budget_time or args.budget_requests:
+        context.budget = BudgetAllocator(args.budget_time, args.budget_requests, args.parallel)
+    if args.managed_recursion:
+        context.directory_jobs = DirectoryJobs([path.strip() for path in args.recursion_wordlists.split(',') if path.strip()],
+                                               context.budget)
+    if args.learned_order:
+        context.hit_stats = HitStats(args.cache_dir, [group.strip().lower() for group in args.learned_groups.split(',') if group.strip()])
+        if args.learn_from:
+            context.hit_stats.learn_from(args.learn_from, SCAN_EXTENSIONS)
+    if args.trace:
+        context.tracer = Tracer(args.trace)
+        atexit.register(context.tracer.close)
+    if args.profile:
+        context.profiler = SamplingProfiler(args.profile)
+        context.profiler.start()
+        atexit.register(context.profiler.close)
+    budget = context.budget
+    directory_jobs = context.directory_jobs
+
+    if args.enqueue and not args.list:
+        print("--enqueue needs a target list (-l).")
+        sys.exit(1)
+
     if args.url:
         url = args.url.strip()
         # Check if URL starts with http:// or https://
@@ -387,7 +3706,8 @@ def main():
             temp_url_file.close()
             temp_output_file = tempfile.NamedTemporaryFile(mode='w+', delete=False)
             temp_output_file.close()
-            subprocess.run(['httpx', '-silent', '-l', temp_url_file.name, '-o', temp_output_file.name])
+            with trace_span(context, 'probe', url):
+                subprocess.run(['httpx', '-silent', '-l', temp_url_file.name, '-o', temp_output_file.name])
             with open(temp_output_file.name, 'r') as output_file:
                 urls = [line.strip() for line in output_file if line.strip()]
             os.remove(temp_url_file.name)
@@ -402,79 +3722,130 @@ def main():
             else:
                 print(f"Could not resolve {url} with HTTP or HTTPS.")
                 sys.exit(1)
-        result = process_url(url, args, ffuf_args, add_se=False)
+        harvester = RobotsHarvester(args.cache_dir, args.robots_ttl, context=context)
+        try:
+            robots_paths = harvester.fetch(url)
+        finally:
+            harvester.close()
+        calibrator = None if args.no_calibrate else Calibrator(args.cache_dir, args.calibration_ttl, headers=ffuf_headers(ffuf_args),
+                                                               match_statuses=ffuf_match_statuses(ffuf_args), context=context)
+        try:
+            if args.quick_pass:
+                run_quick_pass([(url, robots_paths)], args, ffuf_args, calibrator, context)
+            result = process_url(url, args, ffuf_args, add_se=False, robots_paths=robots_paths, calibrator=calibrator,
+                                 context=context)
+            if budget:
+                budget.finish(url)
+            # Child scans of the found directories, one after the other
+            while directory_jobs and result != 'interrupt':
+                job = directory_jobs.take(lambda url: True)
+                if not job:
+                    break
+                result = scan_directory(job, args, ffuf_args, context, calibrator=calibrator)
+        finally:
+            if calibrator:
+                calibrator.close()
         if result == 'interrupt':
             sys.exit(0)
-    elif args.list:
+    elif args.worker:
+        queue = WorkQueue(args.worker, args.lease_ttl)
+        queue.start()
+        print(f"Worker {queue.worker_id} taking targets from {args.worker}")
+        if args.quick_pass:
+            print("--quick-pass needs the whole target list and is not used by queue workers.")
+        calibrator = None if args.no_calibrate else Calibrator(args.cache_dir, args.calibration_ttl, headers=ffuf_headers(ffuf_args),
+                                                               match_statuses=ffuf_match_statuses(ffuf_args), context=context)
+        scheduler = Scheduler(args, ffuf_args, True, calibrator=calibrator, on_finish=queue.finish, context=context)
+        if budget:
+            budget.scheduler = scheduler
+            budget.expected_targets = queue.counts().get('pending', 0)
+        harvester = RobotsHarvester(args.cache_dir, args.robots_ttl, args.robots_workers, context=context)
+        threading.Thread(target=feed_from_queue, args=(queue, scheduler, harvester), daemon=True).start()
+        try:
+            scheduler.run()
+        finally:
+            harvester.close()
+            if calibrator:
+                calibrator.close()
+            print_metrics_summary()
+            counts = queue.counts()
+            queue.close()
+            print(f"Queue {args.worker}: " + ', '.join(f"{count} {status}" for status, count in sorted(counts.items())))
+    elif args.enqueue:
         try:
             with open(args.list, 'r') as url_file:
                 urls = [line.strip() for line in url_file if line.strip()]
-            # Randomize the order of URLs before processing
-            random.shuffle(urls)
+        except FileNotFoundError:
+            print(f"URL list file not found: {args.list}")
+            sys.exit(1)
+        random.shuffle(urls)
+        queue = WorkQueue(args.enqueue, args.lease_ttl)
+        added = enqueue_list(urls, queue, context)
+        counts = queue.counts()
+        queue.close()
+        print(f"Queued {added} new targets in {args.enqueue} ({sum(counts.values())} in total). "
+              f"Start workers with: wr.py --worker {args.enqueue}")
+    elif args.list:
+        try:
+            if journal:
+                # The shuffled input list of the original run
+                urls = journal.data['inputs']
+                print(f"Resuming run from {journal.path}: {len(journal.pending_targets())} queued targets not finished.")
+            else:
+                with open(args.list, 'r') as url_file:
+                    urls = [line.strip() for line in url_file if line.strip()]
+                # Randomize the order of URLs before processing, with a seed recorded in the journal
+                seed = random.randrange(2 ** 32)
+                random.Random(seed).shuffle(urls)
+                journal_path = args.journal or f"{os.path.basename(args.list)}.journal.jsonl"
+                journal = create_journal(journal_path, sys.argv[1:], seed, urls)
+                print(f"Run journal: {journal_path} (continue an interrupted run with --resume {journal_path})")
+            # Determine if -se should be added (more than 5 URLs)
+            add_se = len(urls) > 5
+            calibrator = None if args.no_calibrate else Calibrator(args.cache_dir, args.calibration_ttl, headers=ffuf_headers(ffuf_args),
+                                                                   match_statuses=ffuf_match_statuses(ffuf_args), context=context)
+            scheduler = Scheduler(args, ffuf_args, add_se, journal, calibrator, context=context)
+            if directory_jobs:
+                directory_jobs.restore(journal)
+            if args.quick_pass and not journal.data.get('quick_pass_done'):
+                # Scanning waits for the quick pass over the whole list
+                scheduler.paused = True
+                threading.Thread(target=quick_pass_then_scan, args=(scheduler, args, ffuf_args, calibrator), daemon=True).start()
+            if budget:
+                budget.scheduler = scheduler
+                budget.expected_targets = len(journal.pending_targets()) if journal.data['probe_done'] else len(urls)
+            harvester = RobotsHarvester(args.cache_dir, args.robots_ttl, args.robots_workers, context=context)
+            # Targets answering exactly like an earlier one are mapped to it instead of scanned
+            deduplicator = None
+            if not args.no_dedup:
+                clusters_path = args.clusters or f"{os.path.basename(args.list)}.clusters.json"
+                deduplicator = Deduplicator(clusters_path, args.robots_workers, headers=ffuf_headers(ffuf_args), context=context)
+            run_started = time.time()
             # Check if URLs start with http:// or https://
             all_have_scheme = all(url.startswith('http://') or url.startswith('https://') for url in urls)
-            if not all_have_scheme:
-                # Use httpx to resolve URLs and detect technologies
+            probe = None
+            if journal.data['probe_done']:
+                # Probing finished in the original run, its targets are queued in the recorded order
+                threading.Thread(target=queue_targets, args=(journal.pending_targets(), scheduler, harvester, deduplicator),
+                                 daemon=True).start()
+            elif not all_have_scheme:
+                # Use httpx to resolve URLs and detect technologies, scanning starts while it runs
                 print("Using httpx to resolve URLs without scheme and detect technologies...")
-                temp_urls_file = tempfile.NamedTemporaryFile(mode='w+', delete=False)
-                temp_urls_file.close()
-                # Write randomized URLs to a temporary file
-                with open(temp_urls_file.name, 'w') as temp_file:
-                    for url in urls:
-                        temp_file.write(f"{url}\n")
-                # Run httpx with -td to detect technologies
-                subprocess.run(['httpx', '-td', '-silent', '-l', temp_urls_file.name, '-o', temp_urls_file.name + '_output'])
-                # Parse the httpx output and categorize URLs
-                priority_urls = []
-                other_urls = []
-                unprocessed_urls = []
-                with open(temp_urls_file.name + '_output', 'r') as url_file:
-                    for line in url_file:
-                        line = line.strip()
-                        if not line:
-                            continue
-                        # Expected format: URL [Title] [Technologies]
-                        parts = line.split('[')
-                        url_part = parts[0].strip()
-                        technologies = ''
-                        if len(parts) > 2:
-                            technologies = '[' + '['.join(parts[2:])  # Reconstruct technologies part
-                        elif len(parts) > 1:
-                            technologies = '[' + parts[1]  # Include the '[' back
-                        technologies = technologies.replace(']', '').strip()
-                        technologies_lower = technologies.lower()
-                        # Check for exclusion technologies
-                        exclusion_techs = ['vpn', 'checkpoint', 'imperva', 'cloudflare', 'cisco']
-                        if any(tech in technologies_lower for tech in exclusion_techs):
-                            unprocessed_urls.append(url_part)
-                            continue
-                        # Check for priority technologies
-                        priority_techs = ['php', 'tomcat', 'iis:8.5']
-                        if any(tech in technologies_lower for tech in priority_techs):
-                            priority_urls.append(url_part)
-                        else:
-                            other_urls.append(url_part)
-                os.remove(temp_urls_file.name)
-                os.remove(temp_urls_file.name + '_output')
-                # Write the categorized URLs to files
-                if unprocessed_urls:
-                    with open('unprocessed.txt', 'w') as f:
-                        for url in unprocessed_urls:
-                            f.write(f"{url}\n")
-                    print(f"Excluded URLs saved to unprocessed.txt")
-                # Combine priority and other URLs
-                urls = priority_urls + other_urls
-            # Determine if -se should be added (more than 5 URLs)
-            add_se = len(urls) > 5
-            for url in urls:
-                result = process_url(url, args, ffuf_args, add_se)
-                if result == 'interrupt':
-                    print("Do you want to continue with the next URL? (y/n): ", end='', flush=True)
-                    choice = sys.stdin.readline().strip().lower()
-                    if choice != 'y':
-                        sys.exit(0)
-                    else:
-                        continue
+                probe = start_probe(urls, scheduler, harvester, deduplicator)
+            else:
+                targets = [(1, url) for url in urls]
+                threading.Thread(target=queue_targets, args=(targets, scheduler, harvester, deduplicator), daemon=True).start()
+            try:
+                scheduler.run()
+            finally:
+                if probe:
+                    stop_process(probe)
+                harvester.close()
+                if calibrator:
+                    calibrator.close()
+                if deduplicator:
+                    deduplicator.copy_findings(run_started)
+                print_metrics_summary()
         except FileNotFoundError:
             print(f"URL list file not found: {args.list}")
             sys.exit(1)